@@ -136,6 +136,12 @@ event UpdateUseDefaultQueue:
 event UpdateAutoAllocate:
     auto_allocate: bool
 
+event UpdateAutoAllocateThreshold:
+    auto_allocate_threshold: uint256
+
+event UpdateTrustStrategies:
+    trust_strategies: bool
+
 event UpdatedMaxDebtForStrategy:
     sender: indexed(address)
     strategy: indexed(address)
@@ -222,6 +228,11 @@ default_queue: public(DynArray[address, MAX_QUEUE])
 use_default_queue: public(bool)
 # Should the vault automatically allocate funds to the first strategy in queue.
 auto_allocate: public(bool)
+# Amount of total idle needed before deposits are automatically allocated.
+auto_allocate_threshold: public(uint256)
+# Should the vault trust its strategies with the amounts they return on redeem
+# and with a standing allowance instead of approving on every deposit.
+trust_strategies: public(bool)
 
 ### ACCOUNTING ###
 # ERC20 - amount of shares per account
@@ -489,6 +500,11 @@ def _erc20_safe_approve(token: address, spender: address, amount: uint256):
     # Used to handle non-compliant tokens like USDT
     assert ERC20(token).approve(spender, amount, default_return_value=True), "approval failed"
 
+@internal
+def _reset_allowance(strategy: address):
+    # Remove any allowance the strategy has over the vaults asset.
+    self._erc20_safe_approve(self.asset, strategy, 0)
+
 @internal
 def _erc20_safe_transfer_from(token: address, sender: address, receiver: address, amount: uint256):
     # Used only to transfer tokens that are not the type managed by this Vault.
@@ -576,17 +592,25 @@ def _max_withdraw(
 
         # Cache the default queue.
         _strategies: DynArray[address, MAX_QUEUE] = self.default_queue
+        # Strategies in the default queue are always active.
+        check_active: bool = False
 
         # If a custom queue was passed, and we don't force the default queue.
         if len(strategies) != 0 and not self.use_default_queue:
             # Use the custom queue.
             _strategies = strategies
+            check_active = True
 
         for strategy in _strategies:
             # Can't use an invalid strategy.
-            assert self.strategies[strategy].activation != 0, "inactive strategy"
+            if check_active:
+                assert self.strategies[strategy].activation != 0, "inactive strategy"
 
             current_debt: uint256 = self.strategies[strategy].current_debt
+            # Nothing can be pulled from a strategy without debt.
+            if current_debt == 0:
+                continue
+
             # Get the maximum amount the vault would withdraw from the strategy.
             to_withdraw: uint256 = min(
                 # What we still need for the full withdraw.
@@ -595,13 +619,13 @@ def _max_withdraw(
                 current_debt
             )
 
-            # Get any unrealised loss for the strategy.
-            unrealised_loss: uint256 = self._assess_share_of_unrealised_losses(strategy, current_debt, to_withdraw)
-
             # See if any limit is enforced by the strategy.
-            strategy_limit: uint256 = IStrategy(strategy).convertToAssets(
-                IStrategy(strategy).maxRedeem(self)
-            )
+            strategy_assets: uint256 = 0
+            strategy_limit: uint256 = 0
+            strategy_assets, strategy_limit = self._strategy_assets(strategy, IStrategy(strategy).maxRedeem(self))
+
+            # Get any unrealised loss for the strategy.
+            unrealised_loss: uint256 = self._assess_share_of_unrealised_losses(current_debt, strategy_assets, to_withdraw)
 
             # Adjust accordingly if there is a max withdraw limit.
             realizable_withdraw: uint256 = to_withdraw - unrealised_loss
@@ -662,11 +686,34 @@ def _deposit(recipient: address, assets: uint256, shares: uint256):
     log Deposit(msg.sender, recipient, assets, shares)
 
     if self.auto_allocate:
-        self._update_debt(self.default_queue[0], max_value(uint256), 0)
+        # Let idle above the minimum build up so small deposits don't each pay for an allocation.
+        if unsafe_sub(self.total_idle, min(self.total_idle, self.minimum_total_idle)) >= self.auto_allocate_threshold:
+            self._update_debt(self.default_queue[0], max_value(uint256), 0)
 
 @view
 @internal
-def _assess_share_of_unrealised_losses(strategy: address, strategy_current_debt: uint256, assets_needed: uint256) -> uint256:
+def _strategy_assets(strategy: address, max_redeem: uint256) -> (uint256, uint256):
+    """
+    Returns what the vaults shares of the strategy are currently worth and 
+    what `max_redeem` of them are worth.
+
+    The shares are only converted once when they can all be redeemed, so the
+    loss assessment and the withdraw limit share the same strategy reads.
+    """
+    # The actual amount that the debt is currently worth.
+    vault_shares: uint256 = IStrategy(strategy).balanceOf(self)
+    strategy_assets: uint256 = IStrategy(strategy).convertToAssets(vault_shares)
+
+    # The vault can never redeem more than it holds.
+    max_withdraw: uint256 = strategy_assets
+    if max_redeem < vault_shares:
+        max_withdraw = IStrategy(strategy).convertToAssets(max_redeem)
+
+    return (strategy_assets, max_withdraw)
+
+@pure
+@internal
+def _assess_share_of_unrealised_losses(strategy_current_debt: uint256, strategy_assets: uint256, assets_needed: uint256) -> uint256:
     """
     Returns the share of losses that a user would take if withdrawing from this strategy
     This accounts for losses that have been realized at the strategy level but not yet
@@ -674,11 +721,9 @@ def _assess_share_of_unrealised_losses(strategy: address, strategy_current_debt:
 
     e.g. if the strategy has unrealised losses for 10% of its current debt and the user 
     wants to withdraw 1_000 tokens, the losses that they will take is 100 token
+
+    `strategy_assets` is what the vaults shares of the strategy are worth.
     """
-    # The actual amount that the debt is currently worth.
-    vault_shares: uint256 = IStrategy(strategy).balanceOf(self)
-    strategy_assets: uint256 = IStrategy(strategy).convertToAssets(vault_shares)
-    
     # If no losses, return 0
     if strategy_assets >= strategy_current_debt or strategy_current_debt == 0:
         return 0
@@ -694,22 +739,27 @@ def _assess_share_of_unrealised_losses(strategy: address, strategy_current_debt:
     return users_share_of_loss
 
 @internal
-def _withdraw_from_strategy(strategy: address, assets_to_withdraw: uint256):
+def _withdraw_from_strategy(strategy: address, assets_to_withdraw: uint256, max_redeem: uint256) -> uint256:
     """
     This takes the amount denominated in asset and performs a {redeem}
     with the corresponding amount of shares.
 
     We use {redeem} to natively take on losses without additional non-4626 standard parameters.
+
+    `max_redeem` is the strategies `maxRedeem` for the vault that the caller
+    has already queried, so it does not need to be read again.
+
+    Returns the amount of assets the strategy reports it sent.
     """
     # Need to get shares since we use redeem to be able to take on losses.
     shares_to_redeem: uint256 = min(
         # Use previewWithdraw since it should round up.
         IStrategy(strategy).previewWithdraw(assets_to_withdraw), 
-        # And check against our actual balance.
-        IStrategy(strategy).balanceOf(self)
+        # And check against the max we can redeem, which is capped by our balance.
+        max_redeem
     )
     # Redeem the shares.
-    IStrategy(strategy).redeem(shares_to_redeem, self, self)
+    return IStrategy(strategy).redeem(shares_to_redeem, self, self)
 
 @internal
 def _redeem(
@@ -763,11 +813,14 @@ def _redeem(
 
         # Cache the default queue.
         _strategies: DynArray[address, MAX_QUEUE] = self.default_queue
+        # Strategies in the default queue are always active.
+        check_active: bool = False
 
         # If a custom queue was passed, and we don't force the default queue.
         if len(strategies) != 0 and not self.use_default_queue:
             # Use the custom queue.
             _strategies = strategies
+            check_active = True
 
         # load to memory to save gas
         current_total_debt: uint256 = self.total_debt
@@ -778,24 +831,32 @@ def _redeem(
         # `assets_to_withdraw` is the amount to request from the current strategy.
         assets_to_withdraw: uint256 = 0
 
+        # Trusted strategies report what they sent so their withdrawals don't need to be measured.
+        trust_strategies: bool = self.trust_strategies
         # To compare against real withdrawals from strategies
         previous_balance: uint256 = ERC20(_asset).balanceOf(self)
 
         for strategy in _strategies:
             # Make sure we have a valid strategy.
-            assert self.strategies[strategy].activation != 0, "inactive strategy"
+            if check_active:
+                assert self.strategies[strategy].activation != 0, "inactive strategy"
 
             # How much should the strategy have.
             current_debt: uint256 = self.strategies[strategy].current_debt
 
+            # Skip strategies without debt to save the external calls.
+            if current_debt == 0:
+                continue
+
             # What is the max amount to withdraw from this strategy.
             assets_to_withdraw = min(assets_needed, current_debt)
 
             # Cache max_withdraw now for use if unrealized loss > 0
             # Use maxRedeem and convert it since we use redeem.
-            max_withdraw: uint256 = IStrategy(strategy).convertToAssets(
-                IStrategy(strategy).maxRedeem(self)
-            )
+            max_redeem: uint256 = IStrategy(strategy).maxRedeem(self)
+            strategy_assets: uint256 = 0
+            max_withdraw: uint256 = 0
+            strategy_assets, max_withdraw = self._strategy_assets(strategy, max_redeem)
 
             # CHECK FOR UNREALISED LOSSES
             # If unrealised losses > 0, then the user will take the proportional share 
@@ -803,7 +864,7 @@ def _redeem(
             # NOTE: strategies need to manage the fact that realising part of the loss can 
             # mean the realisation of 100% of the loss!! (i.e. if for withdrawing 10% of the
             # strategy it needs to unwind the whole position, generated losses might be bigger)
-            unrealised_losses_share: uint256 = self._assess_share_of_unrealised_losses(strategy, current_debt, assets_to_withdraw)
+            unrealised_losses_share: uint256 = self._assess_share_of_unrealised_losses(current_debt, strategy_assets, assets_to_withdraw)
             if unrealised_losses_share > 0:
                 # If max withdraw is limiting the amount to pull, we need to adjust the portion of 
                 # the unrealized loss the user should take.
@@ -842,11 +903,14 @@ def _redeem(
                 continue
             
             # WITHDRAW FROM STRATEGY
-            self._withdraw_from_strategy(strategy, assets_to_withdraw)
-            post_balance: uint256 = ERC20(_asset).balanceOf(self)
-            
-            # Always check against the real amounts.
-            withdrawn: uint256 = post_balance - previous_balance
+            withdrawn: uint256 = self._withdraw_from_strategy(strategy, assets_to_withdraw, max_redeem)
+            if not trust_strategies:
+                # Otherwise always check against the real amounts.
+                post_balance: uint256 = ERC20(_asset).balanceOf(self)
+                withdrawn = post_balance - previous_balance
+                # We update the previous_balance variable here to save gas in next iteration.
+                previous_balance = post_balance
+
             loss: uint256 = 0
             # Check if we redeemed too much.
             if withdrawn > assets_to_withdraw:
@@ -880,9 +944,6 @@ def _redeem(
             if requested_assets <= current_total_idle:
                 break
 
-            # We update the previous_balance variable here to save gas in next iteration.
-            previous_balance = post_balance
-
             # Reduce what we still need. Safe to use assets_to_withdraw 
             # here since it has been checked against requested_assets
             assets_needed -= assets_to_withdraw
@@ -959,6 +1020,9 @@ def _revoke_strategy(strategy: address, force: bool=False):
     # Set the default queue to our updated queue.
     self.default_queue = new_queue
 
+    # Remove any standing allowance the strategy was given.
+    self._reset_allowance(strategy)
+
     log StrategyChanged(strategy, StrategyChangeType.REVOKED)
 
 # DEBT MANAGEMENT #
@@ -1001,9 +1065,10 @@ def _update_debt(strategy: address, target_debt: uint256, max_loss: uint256) ->
 
         # Check how much we are able to withdraw.
         # Use maxRedeem and convert since we use redeem.
-        withdrawable: uint256 = IStrategy(strategy).convertToAssets(
-            IStrategy(strategy).maxRedeem(self)
-        )
+        max_redeem: uint256 = IStrategy(strategy).maxRedeem(self)
+        strategy_assets: uint256 = 0
+        withdrawable: uint256 = 0
+        strategy_assets, withdrawable = self._strategy_assets(strategy, max_redeem)
 
         # If insufficient withdrawable, withdraw what we can.
         if withdrawable < assets_to_withdraw:
@@ -1013,7 +1078,7 @@ def _update_debt(strategy: address, target_debt: uint256, max_loss: uint256) ->
             return current_debt
 
         # If there are unrealised losses we don't let the vault reduce its debt until there is a new report
-        unrealised_losses_share: uint256 = self._assess_share_of_unrealised_losses(strategy, current_debt, assets_to_withdraw)
+        unrealised_losses_share: uint256 = self._assess_share_of_unrealised_losses(current_debt, strategy_assets, assets_to_withdraw)
         assert unrealised_losses_share == 0, "strategy has unrealised losses"
         
         # Cache for repeated use.
@@ -1021,7 +1086,7 @@ def _update_debt(strategy: address, target_debt: uint256, max_loss: uint256) ->
 
         # Always check the actual amount withdrawn.
         pre_balance: uint256 = ERC20(_asset).balanceOf(self)
-        self._withdraw_from_strategy(strategy, assets_to_withdraw)
+        self._withdraw_from_strategy(strategy, assets_to_withdraw, max_redeem)
         post_balance: uint256 = ERC20(_asset).balanceOf(self)
         
         # making sure we are changing idle according to the real result no matter what. 
@@ -1082,17 +1147,30 @@ def _update_debt(strategy: address, target_debt: uint256, max_loss: uint256) ->
         if assets_to_deposit > 0:
             # Cache for repeated use.
             _asset: address = self.asset
-
+            allowance: uint256 = ERC20(_asset).allowance(self, strategy)
             # Approve the strategy to pull only what we are giving it.
-            self._erc20_safe_approve(_asset, strategy, assets_to_deposit)
+            approval: uint256 = assets_to_deposit
+            if self.trust_strategies:
+                # Trusted strategies keep a standing allowance that is only topped up when needed.
+                approval = max_value(uint256)
+                if allowance >= assets_to_deposit:
+                    approval = 0
+
+            if approval != 0:
+                # Tokens like USDT can't change a non zero allowance, i.e. one
+                # left over from when the strategy was trusted.
+                if allowance != 0:
+                    self._reset_allowance(strategy)
+                self._erc20_safe_approve(_asset, strategy, approval)
 
             # Always update based on actual amounts deposited.
             pre_balance: uint256 = ERC20(_asset).balanceOf(self)
             IStrategy(strategy).deposit(assets_to_deposit, self)
             post_balance: uint256 = ERC20(_asset).balanceOf(self)
 
-            # Make sure our approval is always back to 0.
-            self._erc20_safe_approve(_asset, strategy, 0)
+            if not self.trust_strategies:
+                # Make sure our approval is always back to 0.
+                self._reset_allowance(strategy)
 
             # Making sure we are changing according to the real result no 
             # matter what. This will spend more gas but makes it more robust.
@@ -1390,6 +1468,29 @@ def set_use_default_queue(use_default_queue: bool):
 
     log UpdateUseDefaultQueue(use_default_queue)
 
+@external
+def set_trust_strategies(trust_strategies: bool):
+    """
+    @notice Set a new value for `trust_strategies`.
+    @dev If set `True` the vault uses the amount returned by each
+        strategies `redeem` during withdraws instead of checking its
+        own balance before and after, and gives strategies a standing
+        allowance instead of approving and resetting on every deposit.
+        Only for strategies that are known to return the exact amount
+        sent. Every call removes the standing allowances of the strategies
+        in the default queue, any other strategy keeps its allowance until
+        its next deposit or it is revoked.
+    @param trust_strategies new value.
+    """
+    self._enforce_role(msg.sender, Roles.ADD_STRATEGY_MANAGER)
+    self.trust_strategies = trust_strategies
+
+    # Standing allowances are granted again on the next deposit if trusted.
+    for strategy in self.default_queue:
+        self._reset_allowance(strategy)
+
+    log UpdateTrustStrategies(trust_strategies)
+
 @external
 def set_auto_allocate(auto_allocate: bool):
     """
@@ -1404,6 +1505,22 @@ def set_auto_allocate(auto_allocate: bool):
     self.auto_allocate = auto_allocate
 
     log UpdateAutoAllocate(auto_allocate)
+
+@external
+def set_auto_allocate_threshold(auto_allocate_threshold: uint256):
+    """
+    @notice Set new value for `auto_allocate_threshold`
+    @dev With `auto_allocate` on, deposits will only allocate once
+        `total_idle` above `minimum_total_idle` has reached the
+        threshold. Until then deposits
+        stay idle and can be allocated by the next depositor or a
+        DEBT_MANAGER.
+    @param auto_allocate_threshold new value.
+    """
+    self._enforce_role(msg.sender, Roles.DEBT_MANAGER)
+    self.auto_allocate_threshold = auto_allocate_threshold
+
+    log UpdateAutoAllocateThreshold(auto_allocate_threshold)
     
 @external
 def set_deposit_limit(deposit_limit: uint256, override: bool = False):
@@ -2132,7 +2249,11 @@ def assess_share_of_unrealised_losses(strategy: address, assets_needed: uint256)
     current_debt: uint256 = self.strategies[strategy].current_debt
     assert current_debt >= assets_needed
 
-    return self._assess_share_of_unrealised_losses(strategy, current_debt, assets_needed)
+    strategy_assets: uint256 = 0
+    max_withdraw: uint256 = 0
+    strategy_assets, max_withdraw = self._strategy_assets(strategy, max_value(uint256))
+
+    return self._assess_share_of_unrealised_losses(current_debt, strategy_assets, assets_needed)
 
 ## Profit locking getter functions ##
 
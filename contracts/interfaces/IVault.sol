@@ -35,6 +35,8 @@ interface IVault is IERC4626 {
         uint256 new_debt
     );
     event UpdateAutoAllocate(bool auto_allocate);
+    event UpdateAutoAllocateThreshold(uint256 auto_allocate_threshold);
+    event UpdateTrustStrategies(bool trust_strategies);
     event UpdateDepositLimit(uint256 deposit_limit);
     event UpdateMinimumTotalIdle(uint256 minimum_total_idle);
     event UpdateProfitMaxUnlockTime(uint256 profit_max_unlock_time);
@@ -58,6 +60,10 @@ interface IVault is IERC4626 {
 
     function auto_allocate() external view returns (bool);
 
+    function auto_allocate_threshold() external view returns (uint256);
+
+    function trust_strategies() external view returns (bool);
+
     function minimum_total_idle() external view returns (uint256);
 
     function deposit_limit() external view returns (uint256);
@@ -98,6 +104,10 @@ interface IVault is IERC4626 {
 
     function set_auto_allocate(bool) external;
 
+    function set_auto_allocate_threshold(uint256) external;
+
+    function set_trust_strategies(bool) external;
+
     function set_deposit_limit(uint256 deposit_limit) external;
 
     function set_deposit_limit(
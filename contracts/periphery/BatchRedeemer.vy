@@ -0,0 +1,165 @@
+# @version 0.3.7
+
+"""
+@title Yearn V3 Vault Batch Redeemer
+@license GNU AGPLv3
+@author yearn.finance
+@notice
+    Redeems the shares of many owners of a Yearn V3 Vault with a single
+    vault `redeem`, so the withdraw queue is only walked once no matter
+    how many owners are exiting.
+
+    Each owner's shares are pulled into this contract, redeemed in
+    aggregate and the `asset` received is split between the receivers
+    pro rata to the shares each owner redeemed. Since all owners exit
+    through the same redeem they all take the same share of any loss.
+
+    Owners need to approve this contract on the vault for the shares to
+    be pulled. The caller must be the owner or an operator the owner has
+    approved on this contract for at least the amount of shares being
+    redeemed. Operator allowances are spent like ERC20 allowances.
+
+    If the vault has a withdraw limit module it is checked for each
+    owner before their shares are pulled, as if each request was its
+    own redeem.
+"""
+
+from vyper.interfaces import ERC20
+
+interface IVault:
+    def asset() -> address: view
+    def withdraw_limit_module() -> address: view
+    def convertToAssets(shares: uint256) -> uint256: view
+    def transferFrom(sender: address, receiver: address, amount: uint256) -> bool: nonpayable
+    def redeem(shares: uint256, receiver: address, owner: address, max_loss: uint256, strategies: DynArray[address, MAX_QUEUE]) -> uint256: nonpayable
+
+interface IWithdrawLimitModule:
+    def available_withdraw_limit(owner: address, max_loss: uint256, strategies: DynArray[address, MAX_QUEUE]) -> uint256: view
+
+# EVENTS #
+# Same as the vault's `Withdraw` for each individual owner.
+event Withdraw:
+    sender: indexed(address)
+    receiver: indexed(address)
+    owner: indexed(address)
+    assets: uint256
+    shares: uint256
+
+event Approval:
+    owner: indexed(address)
+    vault: indexed(address)
+    operator: indexed(address)
+    shares: uint256
+
+# STRUCTS #
+struct RedeemRequest:
+    # The address whose shares are being burnt.
+    owner: address
+    # The address to receive the assets.
+    receiver: address
+    # The amount of shares to redeem.
+    shares: uint256
+    # Max loss in basis points the owner accepts.
+    max_loss: uint256
+
+# CONSTANTS #
+# The max length the withdrawal queue can be.
+MAX_QUEUE: constant(uint256) = 10
+# The max amount of owners that can be redeemed for at once.
+MAX_REQUESTS: constant(uint256) = 100
+# 100% in Basis Points.
+MAX_BPS: constant(uint256) = 10_000
+
+# STORAGE #
+# Owner => vault => operator => shares the operator can redeem for the owner.
+allowance: public(HashMap[address, HashMap[address, HashMap[address, uint256]]])
+
+@internal
+def _erc20_safe_transfer(token: address, receiver: address, amount: uint256):
+    # Used to handle non-compliant tokens like USDT
+    assert ERC20(token).transfer(receiver, amount, default_return_value=True), "transfer failed"
+
+@internal
+def _spend_allowance(owner: address, vault: address, operator: address, shares: uint256):
+    # Unlimited approval does nothing (saves an SSTORE)
+    current_allowance: uint256 = self.allowance[owner][vault][operator]
+    if (current_allowance < max_value(uint256)):
+        assert current_allowance >= shares, "insufficient allowance"
+        self.allowance[owner][vault][operator] = unsafe_sub(current_allowance, shares)
+
+@external
+def approve(vault: address, operator: address, shares: uint256) -> bool:
+    """
+    @notice Let an operator redeem the callers shares of a vault.
+    @param vault The vault the shares belong to.
+    @param operator The address allowed to redeem.
+    @param shares The amount of shares the operator can redeem.
+    @return True.
+    """
+    self.allowance[msg.sender][vault][operator] = shares
+    log Approval(msg.sender, vault, operator, shares)
+    return True
+
+@external
+@nonreentrant("lock")
+def redeem_many(
+    vault: address,
+    requests: DynArray[RedeemRequest, MAX_REQUESTS],
+    strategies: DynArray[address, MAX_QUEUE] = []
+) -> DynArray[uint256, MAX_REQUESTS]:
+    """
+    @notice Redeem shares for many owners in one vault redeem.
+    @dev The aggregate redeem uses the lowest `max_loss` of all requests
+        so every owner's limit is respected.
+    @param vault The vault to redeem from.
+    @param requests The owners, receivers, shares and max losses to redeem.
+    @param strategies Optional array of strategies to withdraw from.
+    @return The amount of assets each receiver got.
+    """
+    total_shares: uint256 = 0
+    max_loss: uint256 = MAX_BPS
+
+    for request in requests:
+        assert request.receiver != empty(address), "ZERO ADDRESS"
+        assert request.shares > 0, "no shares to redeem"
+        assert request.max_loss <= MAX_BPS, "max loss"
+        max_loss = min(max_loss, request.max_loss)
+
+    withdraw_limit_module: address = IVault(vault).withdraw_limit_module()
+
+    # Pull all of the shares first.
+    for request in requests:
+        if msg.sender != request.owner:
+            self._spend_allowance(request.owner, vault, msg.sender, request.shares)
+
+        # Respect the owner's limit since the vault only sees this contract.
+        if withdraw_limit_module != empty(address):
+            assert IVault(vault).convertToAssets(request.shares) <= IWithdrawLimitModule(withdraw_limit_module).available_withdraw_limit(request.owner, max_loss, strategies), "exceed withdraw limit"
+
+        IVault(vault).transferFrom(request.owner, self, request.shares)
+        total_shares += request.shares
+
+    assert total_shares > 0, "no shares to redeem"
+
+    # Walk the withdraw queue once for everyone.
+    total_assets: uint256 = IVault(vault).redeem(total_shares, self, self, max_loss, strategies)
+
+    # Split the assets pro rata to the shares redeemed.
+    _asset: address = IVault(vault).asset()
+    assets_out: DynArray[uint256, MAX_REQUESTS] = []
+    remaining_assets: uint256 = total_assets
+    remaining_shares: uint256 = total_shares
+    for request in requests:
+        assets: uint256 = remaining_assets
+        remaining_shares -= request.shares
+        # The last request gets whatever is left so nothing stays behind.
+        if remaining_shares != 0:
+            assets = total_assets * request.shares / total_shares
+
+        remaining_assets -= assets
+        self._erc20_safe_transfer(_asset, request.receiver, assets)
+        assets_out.append(assets)
+
+        log Withdraw(msg.sender, request.receiver, request.owner, assets, request.shares)
+
+    return assets_out
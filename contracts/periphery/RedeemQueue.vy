@@ -0,0 +1,267 @@
+# @version 0.3.7
+
+"""
+@title Yearn V3 Vault Redeem Queue
+@license GNU AGPLv3
+@author yearn.finance
+@notice
+    Asynchronous exit for a single Yearn V3 Vault, for when strategies
+    limit how much can be withdrawn and a normal `redeem` would revert.
+
+    Owners lock their vault shares into a ticket that keeps its place in
+    line, along with the max loss they accept. Once there is enough to
+    withdraw, anyone can fill the oldest tickets in one batch with a
+    single vault `redeem` using the lowest max loss in the batch. Each
+    ticket can then be claimed for its pro rata share of the batch
+    without walking the queue.
+
+    Until it is filled the owner can cancel a ticket to get the shares
+    back, i.e. when its max loss can't be met and it holds up the tickets
+    behind it.
+"""
+
+from vyper.interfaces import ERC20
+
+interface IVault:
+    def asset() -> address: view
+    def transfer(receiver: address, amount: uint256) -> bool: nonpayable
+    def transferFrom(sender: address, receiver: address, amount: uint256) -> bool: nonpayable
+    def redeem(shares: uint256, receiver: address, owner: address, max_loss: uint256, strategies: DynArray[address, MAX_QUEUE]) -> uint256: nonpayable
+
+# EVENTS #
+event RedeemRequested:
+    ticket_id: indexed(uint256)
+    owner: indexed(address)
+    receiver: indexed(address)
+    shares: uint256
+    max_loss: uint256
+
+event RequestsFilled:
+    batch_id: indexed(uint256)
+    first_ticket: uint256
+    end_ticket: uint256
+    shares: uint256
+    assets: uint256
+    max_loss: uint256
+
+event Cancelled:
+    ticket_id: indexed(uint256)
+    owner: indexed(address)
+    shares: uint256
+
+event Claimed:
+    ticket_id: indexed(uint256)
+    receiver: indexed(address)
+    assets: uint256
+
+# STRUCTS #
+struct Ticket:
+    # The address that locked the shares.
+    owner: address
+    # The address to receive the assets.
+    receiver: address
+    # The amount of shares locked, 0 once cancelled or claimed.
+    shares: uint256
+    # Max loss in basis points the owner accepts.
+    max_loss: uint256
+
+struct Batch:
+    # The first ticket filled in the batch.
+    first_ticket: uint256
+    # One past the last ticket filled in the batch.
+    end_ticket: uint256
+    # The amount of shares redeemed.
+    shares: uint256
+    # The amount of assets received for the shares.
+    assets: uint256
+
+# CONSTANTS #
+# The max length the withdrawal queue can be.
+MAX_QUEUE: constant(uint256) = 10
+# The max amount of tickets that can be filled at once.
+MAX_FILL: constant(uint256) = 100
+# 100% in Basis Points.
+MAX_BPS: constant(uint256) = 10_000
+
+# IMMUTABLES #
+# The vault the shares are redeemed from.
+VAULT: immutable(address)
+# The vaults underlying asset.
+ASSET: immutable(address)
+
+# STORAGE #
+# Ticket id => Ticket.
+tickets: public(HashMap[uint256, Ticket])
+# Batch id => Batch.
+batches: public(HashMap[uint256, Batch])
+# The id the next ticket will get.
+next_ticket: public(uint256)
+# The id the next batch will get.
+next_batch: public(uint256)
+# The oldest ticket that has not been filled.
+next_to_fill: public(uint256)
+# The shares of all unfilled tickets.
+pending_shares: public(uint256)
+
+@external
+def __init__(vault: address):
+    VAULT = vault
+    ASSET = IVault(vault).asset()
+
+@internal
+def _erc20_safe_transfer(token: address, receiver: address, amount: uint256):
+    # Used to handle non-compliant tokens like USDT
+    assert ERC20(token).transfer(receiver, amount, default_return_value=True), "transfer failed"
+
+@external
+@nonreentrant("lock")
+def request_redeem(
+    shares: uint256,
+    max_loss: uint256,
+    receiver: address = msg.sender
+) -> uint256:
+    """
+    @notice Lock shares into a ticket at the end of the queue.
+    @dev The caller needs to have approved this contract for `shares`.
+    @param shares The amount of shares to redeem.
+    @param max_loss Max loss in basis points accepted when filled.
+    @param receiver The address to receive the assets once filled.
+    @return The id of the ticket.
+    """
+    assert shares > 0, "no shares to redeem"
+    assert max_loss <= MAX_BPS, "max loss"
+    assert receiver != empty(address), "ZERO ADDRESS"
+
+    IVault(VAULT).transferFrom(msg.sender, self, shares)
+
+    ticket_id: uint256 = self.next_ticket
+    self.tickets[ticket_id] = Ticket({
+        owner: msg.sender,
+        receiver: receiver,
+        shares: shares,
+        max_loss: max_loss
+    })
+    self.next_ticket = ticket_id + 1
+    self.pending_shares += shares
+
+    log RedeemRequested(ticket_id, msg.sender, receiver, shares, max_loss)
+    return ticket_id
+
+@external
+@nonreentrant("lock")
+def fill(
+    count: uint256,
+    strategies: DynArray[address, MAX_QUEUE] = []
+) -> uint256:
+    """
+    @notice Fill the next `count` tickets with one vault redeem.
+    @dev Permissionless. The redeem uses the lowest max loss of the
+        tickets in the batch, cancelled tickets are skipped. Reverts like
+        the vaults `redeem` if there are not enough withdrawable assets or
+        the loss is too high. A ticket whose max loss can't be met holds up
+        the tickets behind it until the loss is reported or it is cancelled.
+    @param count The amount of tickets to fill.
+    @param strategies Optional array of strategies to withdraw from.
+    @return The id of the batch.
+    """
+    assert count > 0, "nothing to fill"
+    assert count <= MAX_FILL, "too many tickets"
+
+    first_ticket: uint256 = self.next_to_fill
+    end_ticket: uint256 = first_ticket + count
+    assert end_ticket <= self.next_ticket, "not enough requests"
+
+    # Add up the shares and respect every owner's limit.
+    shares: uint256 = 0
+    max_loss: uint256 = MAX_BPS
+    for i in range(MAX_FILL):
+        if i == count:
+            break
+        ticket: Ticket = self.tickets[first_ticket + i]
+        if ticket.shares == 0:
+            continue
+        shares += ticket.shares
+        max_loss = min(max_loss, ticket.max_loss)
+
+    # Nothing to redeem if every ticket was cancelled.
+    assets: uint256 = 0
+    if shares != 0:
+        assets = IVault(VAULT).redeem(shares, self, self, max_loss, strategies)
+
+    batch_id: uint256 = self.next_batch
+    self.batches[batch_id] = Batch({
+        first_ticket: first_ticket,
+        end_ticket: end_ticket,
+        shares: shares,
+        assets: assets
+    })
+    self.next_batch = batch_id + 1
+    self.next_to_fill = end_ticket
+    self.pending_shares -= shares
+
+    log RequestsFilled(batch_id, first_ticket, end_ticket, shares, assets, max_loss)
+    return batch_id
+
+@external
+@nonreentrant("lock")
+def cancel(ticket_id: uint256) -> uint256:
+    """
+    @notice Cancel an unfilled ticket and get its shares back.
+    @param ticket_id The ticket to cancel.
+    @return The amount of shares sent back.
+    """
+    assert ticket_id >= self.next_to_fill, "already filled"
+
+    ticket: Ticket = self.tickets[ticket_id]
+    assert ticket.owner == msg.sender, "not owner"
+    assert ticket.shares != 0, "already cancelled"
+
+    self.tickets[ticket_id].shares = 0
+    self.pending_shares -= ticket.shares
+
+    IVault(VAULT).transfer(msg.sender, ticket.shares)
+
+    log Cancelled(ticket_id, msg.sender, ticket.shares)
+    return ticket.shares
+
+@external
+@nonreentrant("lock")
+def claim(ticket_id: uint256, batch_id: uint256) -> uint256:
+    """
+    @notice Send the assets of a filled ticket to its receiver.
+    @param ticket_id The ticket to claim.
+    @param batch_id The batch that filled the ticket.
+    @return The amount of assets sent.
+    """
+    batch: Batch = self.batches[batch_id]
+    assert batch.first_ticket <= ticket_id and ticket_id < batch.end_ticket, "not filled"
+
+    ticket: Ticket = self.tickets[ticket_id]
+    assert ticket.shares != 0, "already claimed"
+
+    # Every ticket in a batch gets the same price per share.
+    assets: uint256 = ticket.shares * batch.assets / batch.shares
+    self.tickets[ticket_id].shares = 0
+
+    self._erc20_safe_transfer(ASSET, ticket.receiver, assets)
+
+    log Claimed(ticket_id, ticket.receiver, assets)
+    return assets
+
+@view
+@external
+def vault() -> address:
+    """
+    @notice Get the vault the queue redeems from.
+    @return The address of the vault.
+    """
+    return VAULT
+
+@view
+@external
+def asset() -> address:
+    """
+    @notice Get the underlying asset of the vault.
+    @return The address of the asset.
+    """
+    return ASSET
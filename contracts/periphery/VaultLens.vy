@@ -0,0 +1,863 @@
+# @version 0.3.7
+
+"""
+@title Yearn V3 Vault Lens
+@license GNU AGPLv3
+@author yearn.finance
+@notice
+    Read only helper that answers questions about a Yearn V3 Vault
+    that would otherwise require a separate call to the vault for
+    every account or strategy involved.
+
+    The lens holds no state and can be used with any vault of the
+    same API version. All calculations mirror the integer math
+    the vault uses internally so the values returned match what
+    the vault itself would return or do at the current block, or for
+    the profit unlocking views, at a given later timestamp.
+"""
+
+from vyper.interfaces import ERC20
+
+interface IStrategy:
+    def balanceOf(owner: address) -> uint256: view
+    def convertToAssets(shares: uint256) -> uint256: view
+    def maxRedeem(owner: address) -> uint256: view
+    def maxDeposit(receiver: address) -> uint256: view
+
+struct StrategyParams:
+    activation: uint256
+    last_report: uint256
+    current_debt: uint256
+    max_debt: uint256
+
+interface IVault:
+    def strategies(strategy: address) -> StrategyParams: view
+    def get_default_queue() -> DynArray[address, MAX_QUEUE]: view
+    def use_default_queue() -> bool: view
+    def withdraw_limit_module() -> address: view
+    def balanceOf(owner: address) -> uint256: view
+    def totalSupply() -> uint256: view
+    def totalAssets() -> uint256: view
+    def totalIdle() -> uint256: view
+    def minimum_total_idle() -> uint256: view
+    def isShutdown() -> bool: view
+    def asset() -> address: view
+    def accountant() -> address: view
+    def FACTORY() -> address: view
+    def totalDebt() -> uint256: view
+    def profitMaxUnlockTime() -> uint256: view
+    def decimals() -> uint8: view
+    def unlockedShares() -> uint256: view
+    def fullProfitUnlockDate() -> uint256: view
+    def profitUnlockingRate() -> uint256: view
+    def lastProfitUpdate() -> uint256: view
+    def maxWithdraw(owner: address, max_loss: uint256, strategies: DynArray[address, MAX_QUEUE]) -> uint256: view
+
+interface IFactory:
+    def protocol_fee_config(vault: address) -> (uint16, address): view
+
+# ENUMS #
+# Why `update_debt` would not move a strategy to its target.
+enum DebtLimit:
+    EQUAL_DEBT # Would revert since the target is the current debt.
+    SHUTDOWN # The vault is shutdown so debt can only go to 0.
+    MAX_DEBT # Capped by the strategy's `max_debt`.
+    MAX_DEPOSIT # Capped by the strategy's `maxDeposit`.
+    MINIMUM_IDLE # Adjusted to keep `minimum_total_idle` in the vault.
+    MAX_REDEEM # Capped by the strategy's `maxRedeem`.
+    UNREALISED_LOSSES # Would revert since the strategy has unrealised losses.
+
+# STRUCTS #
+# Snapshot of the vault's position in a strategy.
+struct StrategyQuote:
+    # If the strategy is active in the vault.
+    active: bool
+    # The debt the vault has recorded for the strategy.
+    current_debt: uint256
+    # What the vault's strategy shares are currently worth.
+    current_assets: uint256
+    # The max the vault can currently redeem from the strategy in `asset`.
+    max_withdraw: uint256
+
+# What the vault would do with a strategy during a withdraw.
+struct WithdrawStep:
+    # The strategy to withdraw from.
+    strategy: address
+    # The amount of `asset` that would be pulled from the strategy.
+    assets_withdrawn: uint256
+    # The share of the strategy's unrealised losses the withdrawer takes.
+    unrealised_loss: uint256
+    # If the strategy's `maxRedeem` limits the amount pulled.
+    limited: bool
+
+# What `update_debt` would do with a strategy.
+struct DebtUpdate:
+    # The strategy to update the debt for.
+    strategy: address
+    # The debt the strategy has before the update.
+    current_debt: uint256
+    # The debt the strategy would end up with.
+    new_debt: uint256
+    # Everything that kept the strategy from reaching its target.
+    limits: DebtLimit
+
+# The debt a strategy should be updated to.
+struct DebtTarget:
+    # The strategy to update the debt for.
+    strategy: address
+    # The debt the strategy should end up with.
+    target_debt: uint256
+
+# What `process_report` would do for a strategy.
+struct ReportPreview:
+    # The gain that would be reported.
+    gain: uint256
+    # The loss that would be reported.
+    loss: uint256
+    # The total fees in `asset` as logged in `StrategyReported`.
+    total_fees: uint256
+    # The part of `total_fees` that goes to the protocol.
+    protocol_fees: uint256
+    # The refunds that would be pulled from the accountant.
+    total_refunds: uint256
+    # The new shares that would be locked for the vault.
+    shares_to_lock: uint256
+    # The shares that would be burned to offset losses and fees.
+    shares_to_burn: uint256
+    # When all locked shares would be unlocked, 0 if none.
+    full_profit_unlock_date: uint256
+
+# CONSTANTS #
+# The max length the withdrawal queue can be.
+MAX_QUEUE: constant(uint256) = 10
+# The max amount of accounts that can be queried at once.
+MAX_ACCOUNTS: constant(uint256) = 1_000
+# 100% in Basis Points.
+MAX_BPS: constant(uint256) = 10_000
+# Extended for profit locking calculations.
+MAX_BPS_EXTENDED: constant(uint256) = 1_000_000_000_000
+
+## INTERNAL HELPERS ##
+@view
+@internal
+def _withdraw_queue(
+    vault: address,
+    strategies: DynArray[address, MAX_QUEUE]
+) -> (DynArray[address, MAX_QUEUE], bool):
+    """
+    Returns the queue the vault would use for a withdraw and
+    if each strategy in it still needs to be checked to be active.
+    """
+    # If a custom queue was passed, and the vault doesn't force the default queue.
+    if len(strategies) != 0 and not IVault(vault).use_default_queue():
+        return (strategies, True)
+
+    return (IVault(vault).get_default_queue(), False)
+
+@view
+@internal
+def _quote_strategies(
+    vault: address,
+    strategies: DynArray[address, MAX_QUEUE]
+) -> DynArray[StrategyQuote, MAX_QUEUE]:
+    """
+    Reads the vault's position in each strategy once so it can
+    be reused for any amount of simulated withdraws.
+    """
+    quotes: DynArray[StrategyQuote, MAX_QUEUE] = []
+    for strategy in strategies:
+        params: StrategyParams = IVault(vault).strategies(strategy)
+        quote: StrategyQuote = empty(StrategyQuote)
+        quote.active = params.activation != 0
+        quote.current_debt = params.current_debt
+
+        # The vault never touches a strategy without debt.
+        if quote.current_debt != 0:
+            vault_shares: uint256 = IStrategy(strategy).balanceOf(vault)
+            max_redeem: uint256 = IStrategy(strategy).maxRedeem(vault)
+            quote.current_assets = IStrategy(strategy).convertToAssets(vault_shares)
+            # Same as the vault's `_strategy_assets`.
+            quote.max_withdraw = quote.current_assets
+            if max_redeem < vault_shares:
+                quote.max_withdraw = IStrategy(strategy).convertToAssets(max_redeem)
+
+        quotes.append(quote)
+
+    return quotes
+
+@pure
+@internal
+def _share_of_unrealised_losses(
+    strategy_current_debt: uint256,
+    strategy_assets: uint256,
+    assets_needed: uint256
+) -> uint256:
+    """
+    Same as the vault's `_assess_share_of_unrealised_losses`.
+    """
+    # If no losses, return 0
+    if strategy_assets >= strategy_current_debt or strategy_current_debt == 0:
+        return 0
+
+    numerator: uint256 = assets_needed * strategy_assets
+    users_share_of_loss: uint256 = assets_needed - numerator / strategy_current_debt
+    # Always round up.
+    if numerator % strategy_current_debt != 0:
+        users_share_of_loss += 1
+
+    return users_share_of_loss
+
+@pure
+@internal
+def _max_withdraw(
+    max_assets: uint256,
+    current_idle: uint256,
+    max_loss: uint256,
+    quotes: DynArray[StrategyQuote, MAX_QUEUE],
+    check_active: bool
+) -> uint256:
+    """
+    Runs the same withdraw simulation as the vault's `_max_withdraw`
+    for an owner worth `max_assets` using cached strategy quotes.
+    """
+    if max_assets <= current_idle:
+        return max_assets
+
+    # Track how much we can pull.
+    have: uint256 = current_idle
+    loss: uint256 = 0
+
+    for quote in quotes:
+        # Can't use an invalid strategy.
+        if check_active:
+            assert quote.active, "inactive strategy"
+
+        current_debt: uint256 = quote.current_debt
+        if current_debt == 0:
+            continue
+
+        # Get the maximum amount the vault would withdraw from the strategy.
+        to_withdraw: uint256 = min(max_assets - have, current_debt)
+
+        # Get any unrealised loss for the strategy.
+        unrealised_loss: uint256 = self._share_of_unrealised_losses(current_debt, quote.current_assets, to_withdraw)
+
+        # Adjust accordingly if there is a max withdraw limit.
+        strategy_limit: uint256 = quote.max_withdraw
+        realizable_withdraw: uint256 = to_withdraw - unrealised_loss
+        if strategy_limit < realizable_withdraw:
+            if unrealised_loss != 0:
+                # lower unrealised loss proportional to the limit.
+                unrealised_loss = unrealised_loss * strategy_limit / realizable_withdraw
+
+            # Still count the unrealised loss as withdrawable.
+            to_withdraw = strategy_limit + unrealised_loss
+
+        # If 0 move on to the next strategy.
+        if to_withdraw == 0:
+            continue
+
+        # If there would be a loss with a non-maximum `max_loss` value.
+        if unrealised_loss > 0 and max_loss < MAX_BPS:
+            # Check if the loss is greater than the allowed range.
+            if loss + unrealised_loss > (have + to_withdraw) * max_loss / MAX_BPS:
+                # If so use the amounts up till now.
+                break
+
+        # Add to what we can pull.
+        have += to_withdraw
+
+        # If we have all we need break.
+        if have >= max_assets:
+            break
+
+        # Add any unrealised loss to the total
+        loss += unrealised_loss
+
+    return have
+
+@pure
+@internal
+def _convert_to_assets(shares: uint256, total_supply: uint256, total_assets: uint256) -> uint256:
+    """
+    Vault `convertToAssets` rounding down with cached totals.
+    """
+    if shares == max_value(uint256) or shares == 0 or total_supply == 0:
+        return shares
+
+    return shares * total_assets / total_supply
+
+@pure
+@internal
+def _convert_to_shares(assets: uint256, total_supply: uint256, total_assets: uint256) -> uint256:
+    """
+    Vault `convertToShares` rounding down with cached totals.
+    """
+    if assets == max_value(uint256) or assets == 0 or total_supply == 0:
+        return assets
+
+    # if total_Supply > 0 but total_assets == 0, price_per_share = 0
+    if total_assets == 0:
+        return 0
+
+    return assets * total_supply / total_assets
+
+@view
+@internal
+def _unlocked_shares_at(vault: address, at_timestamp: uint256) -> uint256:
+    """
+    Same as the vault's `_unlocked_shares` with `at_timestamp`
+    in place of `block.timestamp`.
+    """
+    assert at_timestamp >= block.timestamp, "timestamp in the past"
+
+    full_profit_unlock_date: uint256 = IVault(vault).fullProfitUnlockDate()
+    unlocked_shares: uint256 = 0
+    if full_profit_unlock_date > at_timestamp:
+        # If we have not fully unlocked, we need to calculate how much has been.
+        unlocked_shares = IVault(vault).profitUnlockingRate() * (at_timestamp - IVault(vault).lastProfitUpdate()) / MAX_BPS_EXTENDED
+
+    elif full_profit_unlock_date != 0:
+        # All shares have been unlocked. The vault's `balanceOf` excludes
+        # the shares already unlocked.
+        unlocked_shares = IVault(vault).balanceOf(vault) + IVault(vault).unlockedShares()
+
+    return unlocked_shares
+
+@view
+@internal
+def _total_supply_at(vault: address, at_timestamp: uint256) -> uint256:
+    """
+    Same as the vault's `_total_supply` at `at_timestamp`.
+    """
+    # `totalSupply` already excludes what is unlocked now.
+    total_supply: uint256 = IVault(vault).totalSupply() + IVault(vault).unlockedShares()
+    return total_supply - self._unlocked_shares_at(vault, at_timestamp)
+
+## WITHDRAW LIMITS ##
+@view
+@external
+def max_withdraws(
+    vault: address,
+    owners: DynArray[address, MAX_ACCOUNTS],
+    max_loss: uint256 = 0,
+    strategies: DynArray[address, MAX_QUEUE] = []
+) -> (DynArray[uint256, MAX_ACCOUNTS], DynArray[uint256, MAX_ACCOUNTS]):
+    """
+    @notice Get the max withdraw and max redeem of many owners at once.
+    @dev Returns the same values as calling the vault's `maxWithdraw` and
+        `maxRedeem` with the same `max_loss` and `strategies` for each owner,
+        but only reads each strategy once.
+
+        If the vault uses a withdraw limit module the vault is queried
+        directly for each owner since the module is account specific.
+    @param vault The vault to query.
+    @param owners The owners to get the limits for.
+    @param max_loss Custom max_loss if any.
+    @param strategies Custom strategies queue if any.
+    @return The max amount of assets each owner can withdraw.
+    @return The max amount of shares each owner can redeem.
+    """
+    max_assets: DynArray[uint256, MAX_ACCOUNTS] = []
+    max_shares: DynArray[uint256, MAX_ACCOUNTS] = []
+
+    # Cache the vault wide values.
+    total_supply: uint256 = IVault(vault).totalSupply()
+    total_assets: uint256 = IVault(vault).totalAssets()
+    current_idle: uint256 = IVault(vault).totalIdle()
+    use_module: bool = IVault(vault).withdraw_limit_module() != empty(address)
+
+    quotes: DynArray[StrategyQuote, MAX_QUEUE] = []
+    check_active: bool = False
+    if not use_module:
+        queue: DynArray[address, MAX_QUEUE] = []
+        queue, check_active = self._withdraw_queue(vault, strategies)
+        quotes = self._quote_strategies(vault, queue)
+
+    for owner in owners:
+        shares: uint256 = IVault(vault).balanceOf(owner)
+        assets: uint256 = 0
+
+        if use_module:
+            assets = IVault(vault).maxWithdraw(owner, max_loss, strategies)
+        else:
+            assets = self._max_withdraw(
+                self._convert_to_assets(shares, total_supply, total_assets),
+                current_idle,
+                max_loss,
+                quotes,
+                check_active
+            )
+
+        max_assets.append(assets)
+        max_shares.append(
+            min(self._convert_to_shares(assets, total_supply, total_assets), shares)
+        )
+
+    return (max_assets, max_shares)
+
+## WITHDRAW PREVIEWS ##
+@view
+@external
+def preview_withdraw_path(
+    vault: address,
+    assets: uint256,
+    max_loss: uint256 = 0,
+    strategies: DynArray[address, MAX_QUEUE] = []
+) -> (DynArray[WithdrawStep, MAX_QUEUE], uint256):
+    """
+    @notice Preview how a withdraw of `assets` would be serviced.
+    @dev Follows the same path as the vault's `_redeem` and reverts
+        with the same message in any case that the vault would.
+
+        Assumes each strategy returns exactly what is requested from it,
+        so any loss realized during the actual redeem is not included.
+        A withdraw limit module, if set, is not checked since it is
+        specific to the owner.
+    @param vault The vault to preview the withdraw for.
+    @param assets The amount of `asset` to withdraw.
+    @param max_loss Custom max_loss if any.
+    @param strategies Custom strategies queue if any.
+    @return The amounts taken from each strategy the vault would touch.
+    @return The amount of `asset` that would be sent to the receiver.
+    """
+    assert assets > 0, "no assets to withdraw"
+    assert max_loss <= MAX_BPS, "max loss"
+
+    steps: DynArray[WithdrawStep, MAX_QUEUE] = []
+    # The amount of the underlying token to withdraw.
+    requested_assets: uint256 = assets
+    current_total_idle: uint256 = IVault(vault).totalIdle()
+
+    # If there are not enough assets in the Vault contract, we try to free
+    # funds from strategies.
+    if requested_assets > current_total_idle:
+        queue: DynArray[address, MAX_QUEUE] = []
+        check_active: bool = False
+        queue, check_active = self._withdraw_queue(vault, strategies)
+        quotes: DynArray[StrategyQuote, MAX_QUEUE] = self._quote_strategies(vault, queue)
+
+        # `assets_needed` is the total amount we need to fill the request.
+        assets_needed: uint256 = unsafe_sub(requested_assets, current_total_idle)
+
+        for i in range(MAX_QUEUE):
+            if i == len(quotes):
+                break
+
+            quote: StrategyQuote = quotes[i]
+            # Make sure we have a valid strategy.
+            if check_active:
+                assert quote.active, "inactive strategy"
+
+            current_debt: uint256 = quote.current_debt
+            if current_debt == 0:
+                continue
+
+            # What is the max amount to withdraw from this strategy.
+            assets_to_withdraw: uint256 = min(assets_needed, current_debt)
+            max_withdraw: uint256 = quote.max_withdraw
+
+            unrealised_losses_share: uint256 = self._share_of_unrealised_losses(
+                current_debt, quote.current_assets, assets_to_withdraw
+            )
+            # If the strategy's max redeem is limiting the amount to pull.
+            limited: bool = max_withdraw < assets_to_withdraw - unrealised_losses_share
+
+            if unrealised_losses_share > 0:
+                if limited:
+                    # How much would we want to withdraw
+                    wanted: uint256 = assets_to_withdraw - unrealised_losses_share
+                    # Get the proportion of unrealised comparing what we want vs. what we can get
+                    unrealised_losses_share = unrealised_losses_share * max_withdraw / wanted
+                    # Adjust assets_to_withdraw so all future calculations work correctly
+                    assets_to_withdraw = max_withdraw + unrealised_losses_share
+
+                # User now "needs" less assets to be unlocked (as he took some as losses)
+                assets_to_withdraw -= unrealised_losses_share
+                requested_assets -= unrealised_losses_share
+                assets_needed -= unrealised_losses_share
+
+            # Adjust based on the max withdraw of the strategy.
+            assets_to_withdraw = min(assets_to_withdraw, max_withdraw)
+
+            if assets_to_withdraw == 0 and unrealised_losses_share == 0:
+                continue
+
+            steps.append(
+                WithdrawStep({
+                    strategy: queue[i],
+                    assets_withdrawn: assets_to_withdraw,
+                    unrealised_loss: unrealised_losses_share,
+                    limited: limited
+                })
+            )
+
+            # Can't withdraw 0.
+            if assets_to_withdraw == 0:
+                continue
+
+            current_total_idle += assets_to_withdraw
+
+            # Break if we have enough total idle to serve initial request.
+            if requested_assets <= current_total_idle:
+                break
+
+            # Reduce what we still need.
+            assets_needed -= assets_to_withdraw
+
+        # If we exhaust the queue and still have insufficient total idle, revert.
+        assert current_total_idle >= requested_assets, "insufficient assets in vault"
+
+    # Check if there is a loss and a non-default value was set.
+    if assets > requested_assets and max_loss < MAX_BPS:
+        # Assure the loss is within the allowed range.
+        assert assets - requested_assets <= assets * max_loss / MAX_BPS, "too much loss"
+
+    return (steps, requested_assets)
+
+## WITHDRAW QUEUES ##
+@view
+@external
+def get_withdraw_queue(
+    vault: address,
+    assets: uint256,
+    strategies: DynArray[address, MAX_QUEUE] = []
+) -> DynArray[address, MAX_QUEUE]:
+    """
+    @notice Get the shortest custom queue that can service a withdraw.
+    @dev Strategies without unrealised losses always come first, and in
+        each group the strategy that can cover everything still needed
+        in a single redeem is preferred. If none can, the most liquid is
+        used next. Strategies with nothing to withdraw are left out.
+
+        The returned queue will still be short of `assets` if the vault
+        doesn't have the liquidity. If the vault forces its default queue
+        the returned queue will be ignored during a withdraw.
+    @param vault The vault to build the queue for.
+    @param assets The amount of `asset` to withdraw.
+    @param strategies The strategies to choose from. Defaults to the default queue.
+    @return The queue to pass in to `withdraw` or `redeem`.
+    """
+    queue: DynArray[address, MAX_QUEUE] = []
+
+    current_idle: uint256 = IVault(vault).totalIdle()
+    if assets <= current_idle:
+        return queue
+
+    candidates: DynArray[address, MAX_QUEUE] = strategies
+    if len(candidates) == 0:
+        candidates = IVault(vault).get_default_queue()
+
+    quotes: DynArray[StrategyQuote, MAX_QUEUE] = self._quote_strategies(vault, candidates)
+
+    # How much of a withdraw each strategy can service, including losses taken.
+    coverage: uint256[MAX_QUEUE] = empty(uint256[MAX_QUEUE])
+    # If the strategy has unrealised losses.
+    lossy: bool[MAX_QUEUE] = empty(bool[MAX_QUEUE])
+    for i in range(MAX_QUEUE):
+        if i == len(quotes):
+            break
+
+        quote: StrategyQuote = quotes[i]
+        assert quote.active, "inactive strategy"
+
+        current_debt: uint256 = quote.current_debt
+        if current_debt == 0:
+            continue
+
+        if quote.current_assets >= current_debt:
+            coverage[i] = min(current_debt, quote.max_withdraw)
+        else:
+            # The withdrawer's share of the loss also counts towards the withdraw.
+            lossy[i] = True
+            if quote.current_assets == 0:
+                coverage[i] = current_debt
+            else:
+                coverage[i] = min(current_debt, quote.max_withdraw * current_debt / quote.current_assets)
+
+    assets_needed: uint256 = assets - current_idle
+
+    # Use strategies without losses first.
+    for with_losses in [False, True]:
+        for j in range(MAX_QUEUE):
+            if assets_needed == 0:
+                break
+
+            best: uint256 = MAX_QUEUE
+            for i in range(MAX_QUEUE):
+                if i == len(quotes):
+                    break
+
+                if coverage[i] == 0 or lossy[i] != with_losses:
+                    continue
+
+                if best == MAX_QUEUE:
+                    best = i
+                elif coverage[i] >= assets_needed:
+                    # Use the smallest that can cover the full amount.
+                    if coverage[best] < assets_needed or coverage[i] < coverage[best]:
+                        best = i
+                elif coverage[best] < assets_needed and coverage[i] > coverage[best]:
+                    # Otherwise the one that covers the most.
+                    best = i
+
+            # Nothing left in this group.
+            if best == MAX_QUEUE:
+                break
+
+            queue.append(candidates[best])
+            assets_needed -= min(assets_needed, coverage[best])
+            coverage[best] = 0
+
+    return queue
+
+@view
+@external
+def preview_update_debts(
+    vault: address,
+    targets: DynArray[DebtTarget, MAX_QUEUE]
+) -> DynArray[DebtUpdate, MAX_QUEUE]:
+    """
+    @notice Get what `update_debt` would do for each target if called
+        one after the other in the order passed.
+    @dev Assumes strategies move exactly the amounts requested. Any
+        strategy with `EQUAL_DEBT` or `UNREALISED_LOSSES` set in its
+        limits would make `update_debt` revert, and is previewed as
+        not moving any debt. Each strategy can only be passed once.
+    @param vault The vault to update the debt of.
+    @param targets The strategies and the debt they should end up with.
+    @return The current and new debt of each strategy and what limited it.
+    """
+    total_idle: uint256 = IVault(vault).totalIdle()
+    minimum_total_idle: uint256 = IVault(vault).minimum_total_idle()
+    shutdown: bool = IVault(vault).isShutdown()
+
+    updates: DynArray[DebtUpdate, MAX_QUEUE] = []
+    for target in targets:
+        strategy: address = target.strategy
+        for update in updates:
+            assert update.strategy != strategy, "duplicate strategy"
+
+        params: StrategyParams = IVault(vault).strategies(strategy)
+        current_debt: uint256 = params.current_debt
+        new_debt: uint256 = target.target_debt
+        limits: DebtLimit = empty(DebtLimit)
+
+        # If the vault is shutdown we can only pull funds.
+        if shutdown and new_debt != 0:
+            new_debt = 0
+            limits |= DebtLimit.SHUTDOWN
+
+        if new_debt == current_debt:
+            limits |= DebtLimit.EQUAL_DEBT
+
+        elif current_debt > new_debt:
+            # Reduce debt.
+            assets_to_withdraw: uint256 = unsafe_sub(current_debt, new_debt)
+
+            # Respect minimum total idle in vault
+            if total_idle + assets_to_withdraw < minimum_total_idle:
+                assets_to_withdraw = min(unsafe_sub(minimum_total_idle, total_idle), current_debt)
+                limits |= DebtLimit.MINIMUM_IDLE
+
+            vault_shares: uint256 = IStrategy(strategy).balanceOf(vault)
+            max_redeem: uint256 = IStrategy(strategy).maxRedeem(vault)
+            strategy_assets: uint256 = IStrategy(strategy).convertToAssets(vault_shares)
+            withdrawable: uint256 = strategy_assets
+            if max_redeem < vault_shares:
+                withdrawable = IStrategy(strategy).convertToAssets(max_redeem)
+
+            # If insufficient withdrawable, withdraw what we can.
+            if withdrawable < assets_to_withdraw:
+                assets_to_withdraw = withdrawable
+                limits |= DebtLimit.MAX_REDEEM
+
+            # The vault won't reduce debt until the losses are reported.
+            if assets_to_withdraw != 0 and self._share_of_unrealised_losses(current_debt, strategy_assets, assets_to_withdraw) != 0:
+                assets_to_withdraw = 0
+                limits |= DebtLimit.UNREALISED_LOSSES
+
+            total_idle += assets_to_withdraw
+            new_debt = current_debt - assets_to_withdraw
+
+        else:
+            # Respect the maximum amount allowed.
+            if new_debt > params.max_debt:
+                new_debt = max(params.max_debt, current_debt)
+                limits |= DebtLimit.MAX_DEBT
+
+            assets_to_deposit: uint256 = new_debt - current_debt
+            if assets_to_deposit != 0:
+                max_deposit: uint256 = IStrategy(strategy).maxDeposit(vault)
+                if assets_to_deposit > max_deposit:
+                    assets_to_deposit = max_deposit
+                    limits |= DebtLimit.MAX_DEPOSIT
+
+                # Ensure we always have minimum_total_idle.
+                available_idle: uint256 = 0
+                if total_idle > minimum_total_idle:
+                    available_idle = unsafe_sub(total_idle, minimum_total_idle)
+
+                if assets_to_deposit > available_idle:
+                    assets_to_deposit = available_idle
+                    limits |= DebtLimit.MINIMUM_IDLE
+
+            total_idle -= assets_to_deposit
+            new_debt = current_debt + assets_to_deposit
+
+        updates.append(DebtUpdate({
+            strategy: strategy,
+            current_debt: current_debt,
+            new_debt: new_debt,
+            limits: limits
+        }))
+
+    return updates
+
+## PROFIT UNLOCKING ##
+@view
+@external
+def unlocked_shares_at(vault: address, at_timestamp: uint256) -> uint256:
+    """
+    @notice Get the amount of shares that will have unlocked at `at_timestamp`.
+    @dev Assumes there are no reports in between. Past timestamps are
+        not supported since the vault only keeps the current schedule.
+    @param vault The vault to check.
+    @param at_timestamp The timestamp to check at.
+    @return The amount of unlocked shares.
+    """
+    return self._unlocked_shares_at(vault, at_timestamp)
+
+@view
+@external
+def total_supply_at(vault: address, at_timestamp: uint256) -> uint256:
+    """
+    @notice Get what the vaults `totalSupply` will be at `at_timestamp`.
+    @dev Assumes there are no reports, deposits or withdraws in between.
+    @param vault The vault to check.
+    @param at_timestamp The timestamp to check at.
+    @return The total supply of shares.
+    """
+    return self._total_supply_at(vault, at_timestamp)
+
+@view
+@external
+def price_per_share_at(vault: address, at_timestamp: uint256) -> uint256:
+    """
+    @notice Get what the vaults `pricePerShare` will be at `at_timestamp`.
+    @dev Assumes there are no reports, deposits or withdraws in between.
+    @param vault The vault to check.
+    @param at_timestamp The timestamp to check at.
+    @return The price per share.
+    """
+    return self._convert_to_assets(
+        10 ** convert(IVault(vault).decimals(), uint256),
+        self._total_supply_at(vault, at_timestamp),
+        IVault(vault).totalAssets()
+    )
+
+## REPORTS ##
+@view
+@external
+def preview_report(
+    vault: address,
+    strategy: address,
+    total_fees: uint256 = 0,
+    total_refunds: uint256 = 0
+) -> ReportPreview:
+    """
+    @notice Get what `process_report` would do for a strategy at the
+        current block without changing any state.
+    @dev Accountants key off the calling vault and may approve refunds
+        during `report`, so the fees and refunds have to be passed in.
+        They can be read by calling the accountants `report` from the
+        vault's address. Refunds are assumed to be approved and are only
+        limited by the accountants balance. Both are ignored if the vault
+        has no accountant.
+    @param vault The vault to report to.
+    @param strategy The strategy to report, or the vault for airdrops.
+    @param total_fees The fees the accountant would charge in `asset`.
+    @param total_refunds The refunds the accountant would give in `asset`.
+    @return What the report would do.
+    """
+    preview: ReportPreview = empty(ReportPreview)
+    asset: address = IVault(vault).asset()
+    total_idle: uint256 = IVault(vault).totalIdle()
+
+    strategy_assets: uint256 = 0
+    current_debt: uint256 = 0
+    if strategy != vault:
+        params: StrategyParams = IVault(vault).strategies(strategy)
+        assert params.activation != 0, "inactive strategy"
+        strategy_assets = IStrategy(strategy).convertToAssets(IStrategy(strategy).balanceOf(vault))
+        current_debt = params.current_debt
+    else:
+        strategy_assets = ERC20(asset).balanceOf(vault)
+        current_debt = total_idle
+
+    if strategy_assets > current_debt:
+        preview.gain = unsafe_sub(strategy_assets, current_debt)
+    else:
+        preview.loss = unsafe_sub(current_debt, strategy_assets)
+
+    accountant: address = IVault(vault).accountant()
+    if accountant != empty(address):
+        preview.total_fees = total_fees
+        preview.total_refunds = min(total_refunds, ERC20(asset).balanceOf(accountant))
+
+    # `totalSupply` already excludes the unlocked shares.
+    unlocked_shares: uint256 = IVault(vault).unlockedShares()
+    total_supply: uint256 = IVault(vault).totalSupply()
+    total_assets: uint256 = total_idle + IVault(vault).totalDebt()
+
+    total_fees_shares: uint256 = 0
+    protocol_fee_bps: uint16 = 0
+    protocol_fee_recipient: address = empty(address)
+    if preview.loss + preview.total_fees > 0:
+        # Same as the vault's `_convert_to_shares` rounding up.
+        preview.shares_to_burn = self._convert_to_shares(preview.loss + preview.total_fees, total_supply, total_assets)
+        if total_supply != 0 and total_assets != 0 and (preview.loss + preview.total_fees) * total_supply % total_assets != 0:
+            preview.shares_to_burn += 1
+
+        if preview.total_fees > 0:
+            total_fees_shares = preview.shares_to_burn * preview.total_fees / (preview.loss + preview.total_fees)
+            protocol_fee_bps, protocol_fee_recipient = IFactory(IVault(vault).FACTORY()).protocol_fee_config(vault)
+
+    profit_max_unlock_time: uint256 = IVault(vault).profitMaxUnlockTime()
+    if preview.gain + preview.total_refunds > 0 and profit_max_unlock_time != 0:
+        preview.shares_to_lock = self._convert_to_shares(preview.gain + preview.total_refunds, total_supply, total_assets)
+
+    # Same share accounting as the vault using the supply with unlocked shares.
+    supply: uint256 = total_supply + unlocked_shares
+    total_locked_shares: uint256 = IVault(vault).balanceOf(vault) + unlocked_shares
+    ending_supply: uint256 = supply + preview.shares_to_lock - preview.shares_to_burn - unlocked_shares
+    if ending_supply > supply:
+        total_locked_shares += unsafe_sub(ending_supply, supply)
+        supply = ending_supply
+    elif supply > ending_supply:
+        to_burn: uint256 = min(unsafe_sub(supply, ending_supply), total_locked_shares)
+        total_locked_shares -= to_burn
+        supply -= to_burn
+
+    if preview.shares_to_lock > preview.shares_to_burn:
+        preview.shares_to_lock = unsafe_sub(preview.shares_to_lock, preview.shares_to_burn)
+    else:
+        preview.shares_to_lock = 0
+
+    total_assets = total_assets + preview.total_refunds + preview.gain - preview.loss
+    supply += total_fees_shares
+
+    if total_locked_shares > 0:
+        previously_locked_time: uint256 = 0
+        full_profit_unlock_date: uint256 = IVault(vault).fullProfitUnlockDate()
+        if full_profit_unlock_date > block.timestamp:
+            previously_locked_time = (total_locked_shares - preview.shares_to_lock) * (full_profit_unlock_date - block.timestamp)
+
+        preview.full_profit_unlock_date = block.timestamp + (previously_locked_time + preview.shares_to_lock * profit_max_unlock_time) / total_locked_shares
+
+    # Nothing is unlocked right after a report.
+    if preview.loss + preview.total_fees > preview.gain + preview.total_refunds or profit_max_unlock_time == 0:
+        preview.total_fees = self._convert_to_assets(total_fees_shares, supply, total_assets)
+
+    preview.protocol_fees = preview.total_fees * convert(protocol_fee_bps, uint256) / MAX_BPS
+    return preview
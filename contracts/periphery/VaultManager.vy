@@ -0,0 +1,487 @@
+# @version 0.3.7
+
+"""
+@title Yearn V3 Vault Manager
+@license GNU AGPLv3
+@author yearn.finance
+@notice
+    Batches the role permissioned calls that are usually sent to a
+    Yearn V3 Vault one strategy at a time, so a full pass over the
+    vaults strategies can be done in a single transaction.
+
+    The manager needs to be given the corresponding roles on each vault
+    it is used with. Every function checks that the caller also holds
+    the role on the vault being managed, so the manager never extends
+    what an account is already allowed to do.
+
+    Debt managers can also set target weights for each strategy, in
+    basis points of the vaults total assets, which `allocate` uses to
+    move idle funds to the strategies furthest below their target.
+
+    Each strategies debt is also checkpointed into a running total of
+    debt multiplied by the seconds it was held for. The manager does so
+    on every debt change it makes, so those are counted exactly. Debt
+    changes made outside of it, i.e. withdraws, reports and `update_debt`
+    calls sent straight to the vault, are only counted from the next
+    checkpoint, which anyone can trigger with `checkpoint`.
+"""
+
+interface IStrategy:
+    def maxDeposit(receiver: address) -> uint256: view
+
+interface IVault:
+    def roles(account: address) -> uint256: view
+    def strategies(strategy: address) -> StrategyParams: view
+    def get_default_queue() -> DynArray[address, MAX_QUEUE]: view
+    def totalAssets() -> uint256: view
+    def totalIdle() -> uint256: view
+    def minimum_total_idle() -> uint256: view
+    def isShutdown() -> bool: view
+    def update_debt(strategy: address, target_debt: uint256, max_loss: uint256) -> uint256: nonpayable
+    def update_max_debt_for_strategy(strategy: address, new_max_debt: uint256): nonpayable
+    def set_default_queue(new_default_queue: DynArray[address, MAX_QUEUE]): nonpayable
+    def process_report(strategy: address) -> (uint256, uint256): nonpayable
+
+# EVENTS #
+event UpdateTargetWeight:
+    vault: indexed(address)
+    strategy: indexed(address)
+    target_weight: uint256
+
+event DrainFailed:
+    vault: indexed(address)
+    strategy: indexed(address)
+
+# STRUCTS #
+struct StrategyParams:
+    activation: uint256
+    last_report: uint256
+    current_debt: uint256
+    max_debt: uint256
+
+struct DebtTarget:
+    # The strategy to update the debt for.
+    strategy: address
+    # The debt the strategy should end up with.
+    target_debt: uint256
+    # Max loss in basis points accepted when reducing debt.
+    max_loss: uint256
+
+struct DebtCheckpoint:
+    # Sum of the debt times the seconds it was held up to `last_update`.
+    debt_seconds: uint256
+    # The strategies debt as of `last_update`.
+    current_debt: uint256
+    # Timestamp of the last checkpoint.
+    last_update: uint256
+
+struct MaxDebt:
+    # The strategy to update the max debt for.
+    strategy: address
+    # The new max debt for the strategy.
+    max_debt: uint256
+
+# CONSTANTS #
+# The max length the withdrawal queue can be.
+MAX_QUEUE: constant(uint256) = 10
+# 100% in Basis Points.
+MAX_BPS: constant(uint256) = 10_000
+# The max amount of strategies that can be configured at once.
+MAX_STRATEGIES: constant(uint256) = 50
+
+# Vault roles. Same as `Roles` in the vault.
+QUEUE_MANAGER: constant(uint256) = 16
+REPORTING_MANAGER: constant(uint256) = 32
+DEBT_MANAGER: constant(uint256) = 64
+MAX_DEBT_MANAGER: constant(uint256) = 128
+
+# STORAGE #
+# Vault => strategy => target share of the vaults total assets in basis points.
+target_weights: public(HashMap[address, HashMap[address, uint256]])
+# Vault => sum of all its strategies target weights.
+total_weight: public(HashMap[address, uint256])
+# Vault => strategy => last debt checkpoint.
+debt_checkpoints: public(HashMap[address, HashMap[address, DebtCheckpoint]])
+
+@view
+@internal
+def _enforce_role(vault: address, account: address, role: uint256):
+    # Make sure the sender holds the role on the vault.
+    assert IVault(vault).roles(account) & role == role, "not allowed"
+
+@internal
+def _checkpoint(vault: address, strategy: address, new_debt: uint256):
+    # Add the debt held since the last checkpoint and record the new debt.
+    # Done right after a change this is the same as checkpointing before
+    # and after it, since no time passes in between.
+    checkpoint: DebtCheckpoint = self.debt_checkpoints[vault][strategy]
+    self.debt_checkpoints[vault][strategy] = DebtCheckpoint({
+        debt_seconds: checkpoint.debt_seconds + checkpoint.current_debt * (block.timestamp - checkpoint.last_update),
+        current_debt: new_debt,
+        last_update: block.timestamp
+    })
+
+@external
+def rebalance(
+    vault: address,
+    targets: DynArray[DebtTarget, MAX_QUEUE]
+) -> DynArray[uint256, MAX_QUEUE]:
+    """
+    @notice Update the debt of many strategies in one call.
+    @dev All debt decreases are done before any increase so the idle
+        freed up can be used to fund the increases.
+    @param vault The vault to rebalance.
+    @param targets The strategies, target debts and max losses.
+    @return The new debt of each strategy in the order passed.
+    """
+    self._enforce_role(vault, msg.sender, DEBT_MANAGER)
+
+    new_debts: DynArray[uint256, MAX_QUEUE] = []
+    increases: DynArray[bool, MAX_QUEUE] = []
+
+    # Pull funds back first.
+    for target in targets:
+        current_debt: uint256 = IVault(vault).strategies(target.strategy).current_debt
+        increases.append(target.target_debt > current_debt)
+
+        if target.target_debt < current_debt:
+            current_debt = IVault(vault).update_debt(target.strategy, target.target_debt, target.max_loss)
+            self._checkpoint(vault, target.strategy, current_debt)
+
+        new_debts.append(current_debt)
+
+    # Then deploy what is now idle.
+    for i in range(MAX_QUEUE):
+        if i == len(targets):
+            break
+
+        if increases[i]:
+            new_debts[i] = IVault(vault).update_debt(targets[i].strategy, targets[i].target_debt, targets[i].max_loss)
+            self._checkpoint(vault, targets[i].strategy, new_debts[i])
+
+    return new_debts
+
+@external
+def set_target_weight(vault: address, strategy: address, target_weight: uint256):
+    """
+    @notice Set the share of the vaults total assets a strategy should hold.
+    @dev Only active strategies can be given a weight. The weight is not
+        removed when a strategy is revoked, set it to 0 to free it up.
+    @param vault The vault the strategy belongs to.
+    @param strategy The strategy to set the weight for.
+    @param target_weight The target weight in basis points.
+    """
+    self._enforce_role(vault, msg.sender, DEBT_MANAGER)
+    # A weight can always be cleared, even for a revoked strategy.
+    if target_weight != 0:
+        assert IVault(vault).strategies(strategy).activation != 0, "inactive strategy"
+
+    total_weight: uint256 = self.total_weight[vault] - self.target_weights[vault][strategy] + target_weight
+    assert total_weight <= MAX_BPS, "total weight too high"
+
+    self.target_weights[vault][strategy] = target_weight
+    self.total_weight[vault] = total_weight
+
+    log UpdateTargetWeight(vault, strategy, target_weight)
+
+@external
+def allocate(vault: address) -> uint256:
+    """
+    @notice Move idle funds to the default queue strategies that are
+        furthest below their target weight.
+    @dev The deficits are computed once and then filled from the
+        largest down until there is no idle above the minimum left.
+    @param vault The vault to allocate for.
+    @return The total amount of debt added.
+    """
+    self._enforce_role(vault, msg.sender, DEBT_MANAGER)
+
+    total_idle: uint256 = IVault(vault).totalIdle()
+    minimum_total_idle: uint256 = IVault(vault).minimum_total_idle()
+    if total_idle <= minimum_total_idle:
+        return 0
+
+    available: uint256 = unsafe_sub(total_idle, minimum_total_idle)
+    total_assets: uint256 = IVault(vault).totalAssets()
+
+    # Build the deficit list sorted from the largest down.
+    strategies: DynArray[address, MAX_QUEUE] = []
+    current_debts: DynArray[uint256, MAX_QUEUE] = []
+    deficits: DynArray[uint256, MAX_QUEUE] = []
+    default_queue: DynArray[address, MAX_QUEUE] = IVault(vault).get_default_queue()
+    for strategy in default_queue:
+        target_debt: uint256 = total_assets * self.target_weights[vault][strategy] / MAX_BPS
+        current_debt: uint256 = IVault(vault).strategies(strategy).current_debt
+        if target_debt <= current_debt:
+            continue
+
+        deficit: uint256 = unsafe_sub(target_debt, current_debt)
+        strategies.append(strategy)
+        current_debts.append(current_debt)
+        deficits.append(deficit)
+
+        # Move the new entry up to its place.
+        i: uint256 = len(deficits) - 1
+        for j in range(MAX_QUEUE):
+            if i == 0 or deficits[i - 1] >= deficit:
+                break
+
+            strategies[i] = strategies[i - 1]
+            current_debts[i] = current_debts[i - 1]
+            deficits[i] = deficits[i - 1]
+            i -= 1
+
+        strategies[i] = strategy
+        current_debts[i] = current_debt
+        deficits[i] = deficit
+
+    # Fill the largest deficits first.
+    allocated: uint256 = 0
+    for i in range(MAX_QUEUE):
+        if i == len(strategies) or available == 0:
+            break
+
+        new_debt: uint256 = IVault(vault).update_debt(
+            strategies[i],
+            current_debts[i] + min(deficits[i], available),
+            0
+        )
+        self._checkpoint(vault, strategies[i], new_debt)
+        # The vault may add less than asked for.
+        added: uint256 = new_debt - current_debts[i]
+        available -= min(added, available)
+        allocated += added
+
+    return allocated
+
+@external
+def deploy_idle(
+    vault: address,
+    strategies: DynArray[address, MAX_QUEUE] = []
+) -> uint256:
+    """
+    @notice Spread the idle above `minimum_total_idle` over the strategies
+        in proportion to how much more each of them can take.
+    @dev What a strategy can take is the lower of its `max_debt` headroom
+        and its `maxDeposit`. If they can take all of the idle together
+        each of them is filled completely.
+    @param vault The vault to deploy idle for.
+    @param strategies Optional strategies to use, defaults to the default queue.
+    @return The total amount of debt added.
+    """
+    self._enforce_role(vault, msg.sender, DEBT_MANAGER)
+
+    total_idle: uint256 = IVault(vault).totalIdle()
+    minimum_total_idle: uint256 = IVault(vault).minimum_total_idle()
+    if total_idle <= minimum_total_idle:
+        return 0
+
+    available: uint256 = unsafe_sub(total_idle, minimum_total_idle)
+
+    _strategies: DynArray[address, MAX_QUEUE] = strategies
+    if len(_strategies) == 0:
+        _strategies = IVault(vault).get_default_queue()
+
+    # Get how much each strategy can take.
+    current_debts: DynArray[uint256, MAX_QUEUE] = []
+    headrooms: DynArray[uint256, MAX_QUEUE] = []
+    total_headroom: uint256 = 0
+    for strategy in _strategies:
+        params: StrategyParams = IVault(vault).strategies(strategy)
+        headroom: uint256 = 0
+        if params.max_debt > params.current_debt:
+            headroom = min(
+                unsafe_sub(params.max_debt, params.current_debt),
+                IStrategy(strategy).maxDeposit(vault)
+            )
+
+        current_debts.append(params.current_debt)
+        headrooms.append(headroom)
+        total_headroom += headroom
+
+    if total_headroom == 0:
+        return 0
+
+    deployed: uint256 = 0
+    for i in range(MAX_QUEUE):
+        if i == len(_strategies):
+            break
+
+        # Each strategy gets its share of the idle.
+        to_deploy: uint256 = headrooms[i]
+        if total_headroom > available:
+            to_deploy = available * headrooms[i] / total_headroom
+
+        if to_deploy == 0:
+            continue
+
+        new_debt: uint256 = IVault(vault).update_debt(_strategies[i], current_debts[i] + to_deploy, 0)
+        self._checkpoint(vault, _strategies[i], new_debt)
+        deployed += new_debt - current_debts[i]
+
+    return deployed
+
+@external
+def configure(
+    vault: address,
+    max_debts: DynArray[MaxDebt, MAX_STRATEGIES],
+    new_default_queue: DynArray[address, MAX_QUEUE] = []
+):
+    """
+    @notice Update the max debt of many strategies and optionally
+        the default queue in one call.
+    @dev Needs the MAX_DEBT_MANAGER role to update max debts and the
+        QUEUE_MANAGER role to set a queue. An empty queue leaves the
+        current default queue as is.
+    @param vault The vault to configure.
+    @param max_debts The strategies and their new max debt.
+    @param new_default_queue Optional new default queue.
+    """
+    roles: uint256 = IVault(vault).roles(msg.sender)
+
+    if len(max_debts) != 0:
+        assert roles & MAX_DEBT_MANAGER == MAX_DEBT_MANAGER, "not allowed"
+        for max_debt in max_debts:
+            IVault(vault).update_max_debt_for_strategy(max_debt.strategy, max_debt.max_debt)
+
+    if len(new_default_queue) != 0:
+        assert roles & QUEUE_MANAGER == QUEUE_MANAGER, "not allowed"
+        IVault(vault).set_default_queue(new_default_queue)
+
+@external
+def report_and_reduce(
+    vault: address,
+    strategy: address,
+    target_debt: uint256,
+    max_loss: uint256
+) -> uint256:
+    """
+    @notice Report a strategy and then reduce its debt in one call.
+    @dev Realising any unrealised losses first lets the vault reduce
+        the debt of a lossy strategy without waiting for a separate
+        report transaction.
+    @param vault The vault the strategy belongs to.
+    @param strategy The strategy to report and reduce.
+    @param target_debt The debt the strategy should end up with.
+    @param max_loss Max loss in basis points accepted on the withdraw.
+    @return The new debt of the strategy.
+    """
+    self._enforce_role(vault, msg.sender, REPORTING_MANAGER | DEBT_MANAGER)
+
+    IVault(vault).process_report(strategy)
+
+    # Reporting may have already brought the debt down to the target.
+    current_debt: uint256 = IVault(vault).strategies(strategy).current_debt
+    if current_debt > target_debt:
+        current_debt = IVault(vault).update_debt(strategy, target_debt, max_loss)
+
+    self._checkpoint(vault, strategy, current_debt)
+    return current_debt
+
+@external
+def process_reports(
+    vault: address,
+    strategies: DynArray[address, MAX_STRATEGIES]
+) -> (uint256, uint256):
+    """
+    @notice Report many strategies in one call.
+    @dev Each report is still processed by the vault on its own, so the
+        profit unlock schedule is updated once per strategy.
+    @param vault The vault the strategies belong to.
+    @param strategies The strategies to report.
+    @return The total gain and the total loss reported.
+    """
+    self._enforce_role(vault, msg.sender, REPORTING_MANAGER)
+
+    total_gain: uint256 = 0
+    total_loss: uint256 = 0
+    for strategy in strategies:
+        gain: uint256 = 0
+        loss: uint256 = 0
+        gain, loss = IVault(vault).process_report(strategy)
+        total_gain += gain
+        total_loss += loss
+
+        # Reports change the debt.
+        self._checkpoint(vault, strategy, IVault(vault).strategies(strategy).current_debt)
+
+    return (total_gain, total_loss)
+
+@external
+def drain_all(
+    vault: address,
+    max_loss: uint256,
+    strategies: DynArray[address, MAX_QUEUE] = []
+) -> uint256:
+    """
+    @notice Pull all the debt back from the strategies of a shutdown vault.
+    @dev A strategy that reverts is skipped and logged with `DrainFailed`
+        so the rest can still be drained in the same transaction.
+    @param vault The shutdown vault to drain.
+    @param max_loss Max loss in basis points accepted on each withdraw.
+    @param strategies Optional strategies to use, defaults to the default queue.
+    @return The total amount of debt pulled back.
+    """
+    self._enforce_role(vault, msg.sender, DEBT_MANAGER)
+    assert IVault(vault).isShutdown(), "not shutdown"
+
+    _strategies: DynArray[address, MAX_QUEUE] = strategies
+    if len(_strategies) == 0:
+        _strategies = IVault(vault).get_default_queue()
+
+    drained: uint256 = 0
+    for strategy in _strategies:
+        current_debt: uint256 = IVault(vault).strategies(strategy).current_debt
+        if current_debt == 0:
+            continue
+
+        # The vault forces the new debt to 0 once shutdown.
+        success: bool = False
+        response: Bytes[32] = b""
+        success, response = raw_call(
+            vault,
+            concat(
+                method_id("update_debt(address,uint256,uint256)"),
+                convert(strategy, bytes32),
+                convert(0, bytes32),
+                convert(max_loss, bytes32),
+            ),
+            max_outsize=32,
+            revert_on_failure=False
+        )
+        if not success:
+            log DrainFailed(vault, strategy)
+            continue
+
+        new_debt: uint256 = convert(response, uint256)
+        self._checkpoint(vault, strategy, new_debt)
+        drained += current_debt - new_debt
+
+    return drained
+
+@external
+def checkpoint(vault: address, strategies: DynArray[address, MAX_STRATEGIES]):
+    """
+    @notice Checkpoint the current debt of many strategies.
+    @dev Permissionless. Should be called after debt changes that did not
+        go through the manager, i.e. reports and withdraws. The time since
+        the last checkpoint is counted at the debt recorded then.
+    @param vault The vault the strategies belong to.
+    @param strategies The strategies to checkpoint.
+    """
+    for strategy in strategies:
+        self._checkpoint(vault, strategy, IVault(vault).strategies(strategy).current_debt)
+
+@view
+@external
+def debt_seconds(vault: address, strategy: address) -> uint256:
+    """
+    @notice Get the running total of a strategies debt times the seconds
+        it was held for, up to the current block.
+    @dev Assumes the debt has not changed since the last checkpoint.
+    @param vault The vault the strategy belongs to.
+    @param strategy The strategy to get the total for.
+    @return The debt seconds of the strategy.
+    """
+    checkpoint: DebtCheckpoint = self.debt_checkpoints[vault][strategy]
+    return checkpoint.debt_seconds + checkpoint.current_debt * (block.timestamp - checkpoint.last_update)
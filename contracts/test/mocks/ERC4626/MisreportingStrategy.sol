@@ -0,0 +1,32 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity >=0.8.18;
+
+import {ERC4626BaseStrategyMock, IERC20} from "./BaseStrategyMock.sol";
+
+contract ERC4626MisreportingStrategy is ERC4626BaseStrategyMock {
+    // amount redeem reports less than what it transfers
+    uint256 public redeemShortfall;
+
+    constructor(
+        address _vault,
+        address _asset
+    ) ERC4626BaseStrategyMock(_vault, _asset) {}
+
+    // only used during testing
+    function setRedeemShortfall(uint256 _redeemShortfall) external {
+        redeemShortfall = _redeemShortfall;
+    }
+
+    function _freeFunds(
+        uint256 _amount
+    ) internal override returns (uint256 _amountFreed) {}
+
+    function redeem(
+        uint256 _shares,
+        address _receiver,
+        address _owner
+    ) public override returns (uint256) {
+        // transfers the full amount but returns less
+        return super.redeem(_shares, _receiver, _owner) - redeemShortfall;
+    }
+}
@@ -0,0 +1,24 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity >=0.8.18;
+
+import {ERC4626BaseStrategyMock, IERC20} from "./BaseStrategyMock.sol";
+
+contract ERC4626RevertingStrategy is ERC4626BaseStrategyMock {
+    constructor(
+        address _vault,
+        address _asset
+    ) ERC4626BaseStrategyMock(_vault, _asset) {}
+
+    function _freeFunds(
+        uint256 _amount
+    ) internal override returns (uint256 _amountFreed) {}
+
+    // reverts so tests can check the vault never queries the strategy
+    function maxRedeem(address) public view override returns (uint256) {
+        revert("strategy called");
+    }
+
+    function convertToAssets(uint256) public view override returns (uint256) {
+        revert("strategy called");
+    }
+}
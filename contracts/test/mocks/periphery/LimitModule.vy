@@ -11,6 +11,9 @@ default_deposit_limit: public(uint256)
 
 default_withdraw_limit: public(uint256)
 
+# Overrides the default withdraw limit for an owner if set.
+owner_withdraw_limit: public(HashMap[address, uint256])
+
 @external
 def __init__(
     default_deposit_limit: uint256,
@@ -36,6 +39,9 @@ def available_deposit_limit(receiver: address) -> uint256:
 @view
 @external
 def available_withdraw_limit(owner: address, max_loss: uint256, strategies: DynArray[address, 10]) -> uint256:
+    if self.owner_withdraw_limit[owner] != 0:
+        return self.owner_withdraw_limit[owner]
+
     return self.default_withdraw_limit
 
 @external
@@ -50,6 +56,10 @@ def set_default_deposit_limit(limit: uint256):
 def set_default_withdraw_limit(limit: uint256):
     self.default_withdraw_limit = limit
 
+@external
+def set_owner_withdraw_limit(owner: address, limit: uint256):
+    self.owner_withdraw_limit[owner] = limit
+
 @external
 def set_enforce_whitelist(enforce: bool):
     self.enforce_whitelist = enforce
\ No newline at end of file
@@ -270,6 +270,26 @@ def create_faulty_strategy(project, strategist):
     yield create_faulty_strategy
 
 
+# create strategy that reverts if the vault queries it
+@pytest.fixture(scope="session")
+def create_reverting_strategy(project, strategist):
+    def create_reverting_strategy(vault):
+        return strategist.deploy(project.ERC4626RevertingStrategy, vault, vault.asset())
+
+    yield create_reverting_strategy
+
+
+# create strategy whose redeem returns less than it transfers
+@pytest.fixture(scope="session")
+def create_misreporting_strategy(project, strategist):
+    def create_misreporting_strategy(vault):
+        return strategist.deploy(
+            project.ERC4626MisreportingStrategy, vault, vault.asset()
+        )
+
+    yield create_misreporting_strategy
+
+
 @pytest.fixture(scope="session")
 def create_generic_strategy(project, strategist):
     def create_generic_strategy(asset):
@@ -370,6 +390,29 @@ def deploy_limit_module(project, gov):
     yield deploy_limit_module
 
 
+@pytest.fixture(scope="session")
+def vault_lens(project, gov):
+    yield gov.deploy(project.VaultLens)
+
+
+@pytest.fixture(scope="session")
+def batch_redeemer(project, gov):
+    yield gov.deploy(project.BatchRedeemer)
+
+
+@pytest.fixture(scope="session")
+def create_redeem_queue(project, gov):
+    def create_redeem_queue(vault):
+        return gov.deploy(project.RedeemQueue, vault)
+
+    yield create_redeem_queue
+
+
+@pytest.fixture(scope="session")
+def vault_manager(project, gov):
+    yield gov.deploy(project.VaultManager)
+
+
 @pytest.fixture(scope="session")
 def mint_and_deposit_into_strategy(gov, asset):
     def mint_and_deposit_into_strategy(
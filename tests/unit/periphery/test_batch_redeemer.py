@@ -0,0 +1,189 @@
+import ape
+from utils.constants import MAX_INT
+
+
+def test_redeem_many__liquid_strategy__single_vault_withdraw(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    whale,
+    whale_amount,
+    bunny,
+    create_vault,
+    create_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    batch_redeemer,
+):
+    vault = create_vault(asset)
+    strategy = create_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    user_deposit(whale, vault, asset, whale_amount)
+    add_strategy_to_vault(gov, strategy, vault)
+    add_debt_to_strategy(gov, strategy, vault, fish_amount + whale_amount)
+
+    vault.approve(batch_redeemer.address, MAX_INT, sender=fish)
+    vault.approve(batch_redeemer.address, MAX_INT, sender=whale)
+    # fish operates the exit for whale.
+    batch_redeemer.approve(vault.address, fish.address, whale_amount, sender=whale)
+
+    requests = [
+        (fish.address, fish.address, fish_amount, 0),
+        (whale.address, bunny.address, whale_amount, 0),
+    ]
+    tx = batch_redeemer.redeem_many(vault.address, requests, sender=fish)
+
+    assert tx.return_value == [fish_amount, whale_amount]
+    assert asset.balanceOf(fish) == fish_amount
+    assert asset.balanceOf(bunny) == whale_amount
+    assert asset.balanceOf(batch_redeemer) == 0
+    assert vault.balanceOf(batch_redeemer) == 0
+    assert vault.totalSupply() == 0
+    assert batch_redeemer.allowance(whale, vault, fish) == 0
+
+    # The queue is only walked once for both owners.
+    assert len(list(tx.decode_logs(vault.DebtUpdated))) == 1
+
+    event = list(tx.decode_logs(batch_redeemer.Withdraw))
+    assert len(event) == 2
+    assert event[0].sender == fish
+    assert event[0].owner == fish
+    assert event[0].receiver == fish
+    assert event[0].assets == fish_amount
+    assert event[0].shares == fish_amount
+    assert event[1].sender == fish
+    assert event[1].owner == whale
+    assert event[1].receiver == bunny
+    assert event[1].assets == whale_amount
+    assert event[1].shares == whale_amount
+
+
+def test_redeem_many__with_unrealised_losses__shares_loss_pro_rata(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    whale,
+    whale_amount,
+    create_vault,
+    create_lossy_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    batch_redeemer,
+):
+    vault = create_vault(asset)
+    lossy_strategy = create_lossy_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    user_deposit(whale, vault, asset, whale_amount)
+    total = fish_amount + whale_amount
+    add_strategy_to_vault(gov, lossy_strategy, vault)
+    add_debt_to_strategy(gov, lossy_strategy, vault, total)
+
+    # 10% unrealised loss.
+    lossy_strategy.setLoss(gov, total // 10, sender=gov)
+
+    vault.approve(batch_redeemer.address, MAX_INT, sender=fish)
+    vault.approve(batch_redeemer.address, MAX_INT, sender=whale)
+
+    requests = [
+        (fish.address, fish.address, fish_amount, 10_000),
+        (whale.address, whale.address, whale_amount, 999),
+    ]
+    # The lowest max loss applies to the whole batch.
+    with ape.reverts("too much loss"):
+        batch_redeemer.redeem_many(vault.address, requests, sender=whale)
+
+    requests[1] = (whale.address, whale.address, whale_amount, 1_000)
+    tx = batch_redeemer.redeem_many(vault.address, requests, sender=whale)
+
+    assert tx.return_value == [fish_amount * 9 // 10, whale_amount * 9 // 10]
+    assert asset.balanceOf(fish) == fish_amount * 9 // 10
+    assert asset.balanceOf(whale) == whale_amount * 9 // 10
+    assert asset.balanceOf(batch_redeemer) == 0
+    assert vault.totalSupply() == 0
+
+
+def test_redeem_many__operator__spends_allowance(
+    asset,
+    fish,
+    fish_amount,
+    bunny,
+    create_vault,
+    user_deposit,
+    batch_redeemer,
+):
+    vault = create_vault(asset)
+    user_deposit(fish, vault, asset, fish_amount)
+    vault.approve(batch_redeemer.address, MAX_INT, sender=fish)
+
+    # A vault allowance does not make bunny an operator.
+    vault.approve(bunny.address, MAX_INT, sender=fish)
+    requests = [(fish.address, bunny.address, 1, 0)]
+    with ape.reverts("insufficient allowance"):
+        batch_redeemer.redeem_many(vault.address, requests, sender=bunny)
+
+    allowance = fish_amount // 4
+    tx = batch_redeemer.approve(vault.address, bunny.address, allowance, sender=fish)
+
+    event = list(tx.decode_logs(batch_redeemer.Approval))
+    assert len(event) == 1
+    assert event[0].owner == fish
+    assert event[0].vault == vault.address
+    assert event[0].operator == bunny
+    assert event[0].shares == allowance
+
+    # Repeating the owner can't go over the allowance.
+    requests = [(fish.address, bunny.address, allowance, 0)] * 2
+    with ape.reverts("insufficient allowance"):
+        batch_redeemer.redeem_many(vault.address, requests, sender=bunny)
+
+    requests = [(fish.address, bunny.address, allowance, 0)]
+    batch_redeemer.redeem_many(vault.address, requests, sender=bunny)
+
+    assert batch_redeemer.allowance(fish, vault, bunny) == 0
+    assert asset.balanceOf(bunny) == allowance
+    assert vault.balanceOf(fish) == fish_amount - allowance
+
+    # The allowance was spent.
+    with ape.reverts("insufficient allowance"):
+        batch_redeemer.redeem_many(vault.address, requests, sender=bunny)
+
+    # The owner needs no allowance.
+    requests = [(fish.address, fish.address, fish_amount - allowance, 0)]
+    batch_redeemer.redeem_many(vault.address, requests, sender=fish)
+
+    assert asset.balanceOf(fish) == fish_amount - allowance
+    assert vault.balanceOf(fish) == 0
+
+
+def test_redeem_many__with_withdraw_limit_module__checks_each_owner(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    user_deposit,
+    deploy_limit_module,
+    batch_redeemer,
+):
+    vault = create_vault(asset)
+    user_deposit(fish, vault, asset, fish_amount)
+    vault.approve(batch_redeemer.address, MAX_INT, sender=fish)
+
+    # Only fish is limited, the redeemer itself is not.
+    limit_module = deploy_limit_module()
+    limit_module.set_owner_withdraw_limit(fish.address, fish_amount // 2, sender=gov)
+    vault.set_withdraw_limit_module(limit_module, sender=gov)
+
+    requests = [(fish.address, fish.address, fish_amount, 0)]
+    with ape.reverts("exceed withdraw limit"):
+        batch_redeemer.redeem_many(vault.address, requests, sender=fish)
+
+    requests = [(fish.address, fish.address, fish_amount // 2, 0)]
+    batch_redeemer.redeem_many(vault.address, requests, sender=fish)
+
+    assert asset.balanceOf(fish) == fish_amount // 2
+    assert vault.balanceOf(fish) == fish_amount - fish_amount // 2
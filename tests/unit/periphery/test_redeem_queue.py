@@ -0,0 +1,330 @@
+import ape
+import pytest
+from utils.constants import DAY, MAX_INT
+
+
+@pytest.fixture
+def locked_vault(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    whale,
+    whale_amount,
+    create_vault,
+    create_locked_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+):
+    vault = create_vault(asset)
+    locked_strategy = create_locked_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    user_deposit(whale, vault, asset, whale_amount)
+
+    total = fish_amount + whale_amount
+    add_strategy_to_vault(gov, locked_strategy, vault)
+    add_debt_to_strategy(gov, locked_strategy, vault, total)
+    locked_strategy.setLockedFunds(total, DAY, sender=gov)
+
+    yield vault, locked_strategy
+
+
+def test_request_redeem__locks_shares_in_order(
+    fish,
+    fish_amount,
+    whale,
+    whale_amount,
+    bunny,
+    locked_vault,
+    create_redeem_queue,
+):
+    vault, _ = locked_vault
+    redeem_queue = create_redeem_queue(vault)
+
+    # Nothing can be withdrawn straight from the vault.
+    assert vault.maxRedeem(fish) == 0
+
+    vault.approve(redeem_queue.address, MAX_INT, sender=fish)
+    vault.approve(redeem_queue.address, MAX_INT, sender=whale)
+
+    tx = redeem_queue.request_redeem(fish_amount, 0, sender=fish)
+    assert tx.return_value == 0
+
+    event = list(tx.decode_logs(redeem_queue.RedeemRequested))
+    assert len(event) == 1
+    assert event[0].ticket_id == 0
+    assert event[0].owner == fish
+    assert event[0].receiver == fish
+    assert event[0].shares == fish_amount
+    assert event[0].max_loss == 0
+
+    tx = redeem_queue.request_redeem(whale_amount, 0, bunny.address, sender=whale)
+    assert tx.return_value == 1
+
+    assert redeem_queue.tickets(0).owner == fish
+    assert redeem_queue.tickets(0).shares == fish_amount
+    assert redeem_queue.tickets(1).owner == whale
+    assert redeem_queue.tickets(1).receiver == bunny
+    assert redeem_queue.tickets(1).shares == whale_amount
+    assert redeem_queue.next_ticket() == 2
+    assert redeem_queue.pending_shares() == fish_amount + whale_amount
+    assert vault.balanceOf(redeem_queue) == fish_amount + whale_amount
+    assert vault.balanceOf(fish) == 0
+    assert vault.balanceOf(whale) == 0
+
+    with ape.reverts("no shares to redeem"):
+        redeem_queue.request_redeem(0, 0, sender=fish)
+
+    with ape.reverts("max loss"):
+        redeem_queue.request_redeem(fish_amount, 10_001, sender=fish)
+
+
+def test_fill__frees_idle__fills_in_order_and_claims(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    whale,
+    whale_amount,
+    bunny,
+    locked_vault,
+    create_redeem_queue,
+):
+    vault, locked_strategy = locked_vault
+    redeem_queue = create_redeem_queue(vault)
+
+    vault.approve(redeem_queue.address, MAX_INT, sender=fish)
+    vault.approve(redeem_queue.address, MAX_INT, sender=whale)
+    redeem_queue.request_redeem(fish_amount, 0, sender=fish)
+    redeem_queue.request_redeem(whale_amount, 0, sender=whale)
+
+    with ape.reverts("not enough requests"):
+        redeem_queue.fill(3, sender=bunny)
+
+    # Still locked.
+    with ape.reverts("insufficient assets in vault"):
+        redeem_queue.fill(1, sender=bunny)
+
+    # Free up only enough idle for the first ticket.
+    locked_strategy.setLockedFunds(0, 0, sender=gov)
+    vault.update_debt(locked_strategy.address, whale_amount, sender=gov)
+
+    # Anyone can fill.
+    tx = redeem_queue.fill(1, sender=bunny)
+    assert tx.return_value == 0
+
+    event = list(tx.decode_logs(redeem_queue.RequestsFilled))
+    assert len(event) == 1
+    assert event[0].batch_id == 0
+    assert event[0].first_ticket == 0
+    assert event[0].end_ticket == 1
+    assert event[0].shares == fish_amount
+    assert event[0].assets == fish_amount
+    assert event[0].max_loss == 0
+
+    assert redeem_queue.next_to_fill() == 1
+    assert redeem_queue.pending_shares() == whale_amount
+    assert asset.balanceOf(redeem_queue) == fish_amount
+
+    with ape.reverts("not filled"):
+        redeem_queue.claim(1, 0, sender=whale)
+
+    # Anyone can settle a filled ticket to its receiver.
+    tx = redeem_queue.claim(0, 0, sender=bunny)
+    assert tx.return_value == fish_amount
+
+    event = list(tx.decode_logs(redeem_queue.Claimed))
+    assert len(event) == 1
+    assert event[0].ticket_id == 0
+    assert event[0].receiver == fish
+    assert event[0].assets == fish_amount
+
+    assert asset.balanceOf(fish) == fish_amount
+
+    with ape.reverts("already claimed"):
+        redeem_queue.claim(0, 0, sender=fish)
+
+    vault.update_debt(locked_strategy.address, 0, sender=gov)
+    redeem_queue.fill(1, sender=bunny)
+    redeem_queue.claim(1, 1, sender=whale)
+
+    assert asset.balanceOf(whale) == whale_amount
+    assert asset.balanceOf(redeem_queue) == 0
+    assert vault.balanceOf(redeem_queue) == 0
+    assert redeem_queue.pending_shares() == 0
+    assert vault.totalSupply() == 0
+
+
+def test_fill__many_tickets__single_vault_redeem(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    whale,
+    whale_amount,
+    locked_vault,
+    create_redeem_queue,
+):
+    vault, locked_strategy = locked_vault
+    redeem_queue = create_redeem_queue(vault)
+
+    vault.approve(redeem_queue.address, MAX_INT, sender=fish)
+    vault.approve(redeem_queue.address, MAX_INT, sender=whale)
+    tickets = 5
+    for _ in range(tickets):
+        redeem_queue.request_redeem(fish_amount // tickets, 0, sender=fish)
+        redeem_queue.request_redeem(whale_amount // tickets, 0, sender=whale)
+
+    locked_strategy.setLockedFunds(0, 0, sender=gov)
+    vault.update_debt(locked_strategy.address, 0, sender=gov)
+
+    tx = redeem_queue.fill(tickets * 2, sender=gov)
+
+    assert len(list(tx.decode_logs(vault.Withdraw))) == 1
+    assert redeem_queue.batches(0).shares == fish_amount + whale_amount
+    assert redeem_queue.batches(0).assets == fish_amount + whale_amount
+
+    for ticket_id in range(tickets * 2):
+        redeem_queue.claim(ticket_id, 0, sender=gov)
+
+    assert asset.balanceOf(fish) == fish_amount
+    assert asset.balanceOf(whale) == whale_amount
+    assert asset.balanceOf(redeem_queue) == 0
+
+
+def test_fill__with_unrealised_losses__uses_lowest_ticket_max_loss(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    whale,
+    whale_amount,
+    bunny,
+    create_vault,
+    create_lossy_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    create_redeem_queue,
+):
+    vault = create_vault(asset)
+    lossy_strategy = create_lossy_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    user_deposit(whale, vault, asset, whale_amount)
+    total = fish_amount + whale_amount
+    add_strategy_to_vault(gov, lossy_strategy, vault)
+    add_debt_to_strategy(gov, lossy_strategy, vault, total)
+    redeem_queue = create_redeem_queue(vault)
+
+    # 10% unrealised loss.
+    lossy_strategy.setLoss(gov, total // 10, sender=gov)
+
+    vault.approve(redeem_queue.address, MAX_INT, sender=fish)
+    vault.approve(redeem_queue.address, MAX_INT, sender=whale)
+    redeem_queue.request_redeem(fish_amount, 10_000, sender=fish)
+    redeem_queue.request_redeem(whale_amount, 999, sender=whale)
+
+    # The lowest max loss applies to the whole batch.
+    with ape.reverts("too much loss"):
+        redeem_queue.fill(2, sender=bunny)
+
+    tx = redeem_queue.fill(1, sender=bunny)
+
+    event = list(tx.decode_logs(redeem_queue.RequestsFilled))
+    assert len(event) == 1
+    assert event[0].assets == fish_amount * 9 // 10
+    assert event[0].max_loss == 10_000
+
+    with ape.reverts("too much loss"):
+        redeem_queue.fill(1, sender=bunny)
+
+    # Once the loss is reported the ticket can be filled.
+    vault.process_report(lossy_strategy.address, sender=gov)
+    redeem_queue.fill(1, sender=bunny)
+
+    redeem_queue.claim(0, 0, sender=fish)
+    redeem_queue.claim(1, 1, sender=whale)
+
+    assert asset.balanceOf(fish) == fish_amount * 9 // 10
+    assert asset.balanceOf(whale) == whale_amount * 9 // 10
+    assert asset.balanceOf(redeem_queue) == 0
+    assert vault.totalSupply() == 0
+
+
+def test_cancel__blocking_ticket__returns_shares_and_unblocks_queue(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    whale,
+    whale_amount,
+    bunny,
+    create_vault,
+    create_lossy_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    create_redeem_queue,
+):
+    vault = create_vault(asset)
+    lossy_strategy = create_lossy_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    user_deposit(whale, vault, asset, whale_amount)
+    total = fish_amount + whale_amount
+    add_strategy_to_vault(gov, lossy_strategy, vault)
+    add_debt_to_strategy(gov, lossy_strategy, vault, total)
+    redeem_queue = create_redeem_queue(vault)
+
+    # 10% unrealised loss.
+    lossy_strategy.setLoss(gov, total // 10, sender=gov)
+
+    vault.approve(redeem_queue.address, MAX_INT, sender=fish)
+    vault.approve(redeem_queue.address, MAX_INT, sender=whale)
+    # A ticket that accepts no loss at the front of the queue.
+    redeem_queue.request_redeem(fish_amount, 0, sender=fish)
+    redeem_queue.request_redeem(whale_amount, 10_000, sender=whale)
+
+    with ape.reverts("too much loss"):
+        redeem_queue.fill(2, sender=bunny)
+
+    with ape.reverts("not owner"):
+        redeem_queue.cancel(0, sender=whale)
+
+    tx = redeem_queue.cancel(0, sender=fish)
+    assert tx.return_value == fish_amount
+
+    event = list(tx.decode_logs(redeem_queue.Cancelled))
+    assert len(event) == 1
+    assert event[0].ticket_id == 0
+    assert event[0].owner == fish
+    assert event[0].shares == fish_amount
+
+    assert vault.balanceOf(fish) == fish_amount
+    assert redeem_queue.tickets(0).shares == 0
+    assert redeem_queue.pending_shares() == whale_amount
+
+    with ape.reverts("already cancelled"):
+        redeem_queue.cancel(0, sender=fish)
+
+    # The cancelled ticket is skipped.
+    tx = redeem_queue.fill(2, sender=bunny)
+
+    event = list(tx.decode_logs(redeem_queue.RequestsFilled))
+    assert len(event) == 1
+    assert event[0].shares == whale_amount
+    assert event[0].assets == whale_amount * 9 // 10
+    assert event[0].max_loss == 10_000
+    assert redeem_queue.pending_shares() == 0
+
+    with ape.reverts("already filled"):
+        redeem_queue.cancel(1, sender=whale)
+
+    with ape.reverts("already claimed"):
+        redeem_queue.claim(0, 0, sender=fish)
+
+    redeem_queue.claim(1, 0, sender=whale)
+
+    assert asset.balanceOf(whale) == whale_amount * 9 // 10
+    assert asset.balanceOf(redeem_queue) == 0
+    assert vault.balanceOf(redeem_queue) == 0
@@ -0,0 +1,543 @@
+import ape
+import pytest
+from utils.constants import DAY, DebtLimit
+from utils.utils import get_withdraw_queue
+
+
+def check_max_withdraws(vault, vault_lens, owners, max_loss=0, strategies=[]):
+    max_withdraws, max_redeems = vault_lens.max_withdraws(
+        vault.address, [o.address for o in owners], max_loss, strategies
+    )
+
+    assert len(max_withdraws) == len(owners)
+    assert len(max_redeems) == len(owners)
+    for i, owner in enumerate(owners):
+        assert max_withdraws[i] == vault.maxWithdraw(
+            owner.address, max_loss, strategies
+        )
+        assert max_redeems[i] == vault.maxRedeem(owner.address, max_loss, strategies)
+
+    return max_withdraws, max_redeems
+
+
+def test_max_withdraws__no_strategies__returns_balances(
+    asset, fish, fish_amount, bunny, create_vault, user_deposit, vault_lens
+):
+    vault = create_vault(asset)
+    user_deposit(fish, vault, asset, fish_amount)
+
+    max_withdraws, max_redeems = check_max_withdraws(vault, vault_lens, [fish, bunny])
+
+    assert max_withdraws == [fish_amount, 0]
+    assert max_redeems == [fish_amount, 0]
+
+
+def test_max_withdraws__with_liquid_and_locked_strategy__matches_vault(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    whale,
+    whale_amount,
+    bunny,
+    create_vault,
+    create_strategy,
+    create_locked_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_lens,
+):
+    vault = create_vault(asset)
+    liquid_strategy = create_strategy(vault)
+    locked_strategy = create_locked_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    user_deposit(whale, vault, asset, whale_amount)
+
+    total = fish_amount + whale_amount
+    for strategy in [liquid_strategy, locked_strategy]:
+        add_strategy_to_vault(gov, strategy, vault)
+        add_debt_to_strategy(gov, strategy, vault, total // 3)
+
+    # lock half of the locked strategy
+    locked_strategy.setLockedFunds(total // 6, DAY, sender=gov)
+
+    max_withdraws, _ = check_max_withdraws(vault, vault_lens, [fish, whale, bunny])
+
+    assert max_withdraws[0] == fish_amount
+    assert max_withdraws[1] == total - total // 6
+    assert max_withdraws[2] == 0
+
+    # Custom queues are respected.
+    check_max_withdraws(vault, vault_lens, [fish, whale], 0, [locked_strategy.address])
+
+
+@pytest.mark.parametrize("max_loss", [0, 100, 10_000])
+def test_max_withdraws__with_unrealised_losses__matches_vault(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    whale,
+    whale_amount,
+    create_vault,
+    create_strategy,
+    create_lossy_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_lens,
+    max_loss,
+):
+    vault = create_vault(asset)
+    lossy_strategy = create_lossy_strategy(vault)
+    liquid_strategy = create_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    user_deposit(whale, vault, asset, whale_amount)
+
+    total = fish_amount + whale_amount
+    add_strategy_to_vault(gov, lossy_strategy, vault)
+    add_debt_to_strategy(gov, lossy_strategy, vault, total // 2)
+    add_strategy_to_vault(gov, liquid_strategy, vault)
+    add_debt_to_strategy(gov, liquid_strategy, vault, total // 2)
+
+    # Unrealised loss and a limit in the lossy strategy.
+    lossy_strategy.setLoss(gov, total // 10, sender=gov)
+    lossy_strategy.setLockedFunds(total // 10, sender=gov)
+
+    check_max_withdraws(vault, vault_lens, [fish, whale], max_loss)
+    check_max_withdraws(
+        vault,
+        vault_lens,
+        [fish, whale],
+        max_loss,
+        [liquid_strategy.address, lossy_strategy.address],
+    )
+
+
+def test_max_withdraws__with_inactive_strategy__reverts(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_lens,
+):
+    vault = create_vault(asset)
+    strategy = create_strategy(vault)
+    inactive_strategy = create_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    add_strategy_to_vault(gov, strategy, vault)
+    add_debt_to_strategy(gov, strategy, vault, fish_amount)
+
+    with ape.reverts("inactive strategy"):
+        vault_lens.max_withdraws(
+            vault.address, [fish.address], 0, [inactive_strategy.address]
+        )
+
+
+def test_max_withdraws__with_withdraw_limit_module__matches_vault(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    bunny,
+    create_vault,
+    user_deposit,
+    deploy_limit_module,
+    vault_lens,
+):
+    vault = create_vault(asset)
+    user_deposit(fish, vault, asset, fish_amount)
+
+    limit_module = deploy_limit_module(withdraw_limit=fish_amount // 2)
+    vault.set_withdraw_limit_module(limit_module, sender=gov)
+
+    max_withdraws, max_redeems = check_max_withdraws(vault, vault_lens, [fish, bunny])
+
+    assert max_withdraws == [fish_amount // 2, 0]
+    assert max_redeems == [fish_amount // 2, 0]
+
+
+def test_preview_withdraw_path__with_multiple_liquid_strategies(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_lens,
+):
+    vault = create_vault(asset)
+    amount_per_strategy = fish_amount // 4
+    first_strategy = create_strategy(vault)
+    second_strategy = create_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    for strategy in [first_strategy, second_strategy]:
+        add_strategy_to_vault(gov, strategy, vault)
+        add_debt_to_strategy(gov, strategy, vault, amount_per_strategy)
+
+    idle = vault.totalIdle()
+    # Fully covered by idle.
+    steps, assets = vault_lens.preview_withdraw_path(vault.address, idle)
+    assert len(steps) == 0
+    assert assets == idle
+
+    # Needs all of the first and part of the second strategy.
+    amount = idle + amount_per_strategy + amount_per_strategy // 2
+    steps, assets = vault_lens.preview_withdraw_path(vault.address, amount)
+
+    assert assets == amount
+    assert len(steps) == 2
+    assert steps[0].strategy == first_strategy.address
+    assert steps[0].assets_withdrawn == amount_per_strategy
+    assert steps[0].unrealised_loss == 0
+    assert steps[0].limited == False
+    assert steps[1].strategy == second_strategy.address
+    assert steps[1].assets_withdrawn == amount_per_strategy // 2
+
+    tx = vault.withdraw(amount, fish.address, fish.address, sender=fish)
+    event = list(tx.decode_logs(vault.DebtUpdated))
+    assert len(event) == len(steps)
+    for i, step in enumerate(steps):
+        assert event[i].strategy == step.strategy
+        assert event[i].current_debt - event[i].new_debt == step.assets_withdrawn
+
+
+def test_preview_withdraw_path__with_unrealised_losses_and_max_redeem(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    create_lossy_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_lens,
+):
+    vault = create_vault(asset)
+    amount_per_strategy = fish_amount // 2
+    amount_to_lose = amount_per_strategy // 4
+    amount_to_lock = (amount_per_strategy - amount_to_lose) // 2
+    amount_to_withdraw = fish_amount * 3 // 4
+    lossy_strategy = create_lossy_strategy(vault)
+    liquid_strategy = create_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    for strategy in [lossy_strategy, liquid_strategy]:
+        add_strategy_to_vault(gov, strategy, vault)
+        add_debt_to_strategy(gov, strategy, vault, amount_per_strategy)
+
+    lossy_strategy.setLoss(gov, amount_to_lose, sender=gov)
+    lossy_strategy.setLockedFunds(amount_to_lock, sender=gov)
+
+    with ape.reverts("too much loss"):
+        vault_lens.preview_withdraw_path(vault.address, amount_to_withdraw)
+
+    steps, assets = vault_lens.preview_withdraw_path(
+        vault.address, amount_to_withdraw, 10_000
+    )
+
+    assert len(steps) == 2
+    assert steps[0].strategy == lossy_strategy.address
+    assert steps[0].limited == True
+    assert (
+        steps[0].assets_withdrawn
+        == amount_per_strategy - amount_to_lose - amount_to_lock
+    )
+    assert steps[0].unrealised_loss > 0
+    assert steps[1].strategy == liquid_strategy.address
+    assert steps[1].limited == False
+    assert assets == amount_to_withdraw - steps[0].unrealised_loss
+
+    tx = vault.withdraw(
+        amount_to_withdraw, fish.address, fish.address, 10_000, sender=fish
+    )
+    event = list(tx.decode_logs(vault.Withdraw))
+    assert event[0].assets == assets
+
+
+def test_preview_withdraw_path__insufficient_liquidity__reverts(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_locked_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_lens,
+):
+    vault = create_vault(asset)
+    locked_strategy = create_locked_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    add_strategy_to_vault(gov, locked_strategy, vault)
+    add_debt_to_strategy(gov, locked_strategy, vault, fish_amount)
+    locked_strategy.setLockedFunds(fish_amount // 2, DAY, sender=gov)
+
+    steps, assets = vault_lens.preview_withdraw_path(vault.address, fish_amount // 2)
+    assert len(steps) == 1
+    assert steps[0].limited == False
+    assert assets == fish_amount // 2
+
+    with ape.reverts("insufficient assets in vault"):
+        vault_lens.preview_withdraw_path(vault.address, fish_amount)
+
+    with ape.reverts("no assets to withdraw"):
+        vault_lens.preview_withdraw_path(vault.address, 0)
+
+
+def test_get_withdraw_queue__prefers_single_liquid_strategy(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    create_locked_strategy,
+    create_lossy_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_lens,
+):
+    vault = create_vault(asset)
+    lossy_strategy = create_lossy_strategy(vault)
+    locked_strategy = create_locked_strategy(vault)
+    small_strategy = create_strategy(vault)
+    big_strategy = create_strategy(vault)
+    strategies = [lossy_strategy, locked_strategy, small_strategy, big_strategy]
+    user_deposit(fish, vault, asset, fish_amount)
+
+    debts = [fish_amount // 4, fish_amount // 4, fish_amount // 8, fish_amount // 4]
+    for strategy, debt in zip(strategies, debts):
+        add_strategy_to_vault(gov, strategy, vault)
+        add_debt_to_strategy(gov, strategy, vault, debt)
+
+    lossy_strategy.setLoss(gov, fish_amount // 40, sender=gov)
+    locked_strategy.setLockedFunds(fish_amount * 3 // 16, DAY, sender=gov)
+    idle = vault.totalIdle()
+
+    # Idle covers it.
+    assert vault_lens.get_withdraw_queue(vault.address, idle) == []
+
+    # The smallest strategy that can cover the full amount is used alone.
+    amount = idle + fish_amount // 10
+    queue = vault_lens.get_withdraw_queue(vault.address, amount)
+    assert queue == [small_strategy.address]
+    assert queue == get_withdraw_queue(vault, amount, strategies)
+
+    # Too much for one, liquid strategies come before the lossy one.
+    amount = idle + fish_amount // 2
+    queue = vault_lens.get_withdraw_queue(vault.address, amount)
+    assert queue == [
+        big_strategy.address,
+        small_strategy.address,
+        locked_strategy.address,
+        lossy_strategy.address,
+    ]
+    assert queue == get_withdraw_queue(vault, amount, strategies)
+
+    # Only the given strategies are used.
+    amount = idle + fish_amount // 20
+    queue = vault_lens.get_withdraw_queue(
+        vault.address, amount, [lossy_strategy.address, locked_strategy.address]
+    )
+    assert queue == [locked_strategy.address]
+    assert queue == get_withdraw_queue(vault, amount, [lossy_strategy, locked_strategy])
+
+    tx = vault.withdraw(amount, fish.address, fish.address, 0, queue, sender=fish)
+    event = list(tx.decode_logs(vault.DebtUpdated))
+    assert len(event) == 1
+    assert event[0].strategy == locked_strategy.address
+
+
+def test_preview_update_debts__matches_update_debt(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    create_locked_strategy,
+    create_lossy_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_lens,
+):
+    vault = create_vault(asset)
+    strategy = create_strategy(vault)
+    locked_strategy = create_locked_strategy(vault)
+    lossy_strategy = create_lossy_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+
+    for s in [locked_strategy, lossy_strategy]:
+        add_strategy_to_vault(gov, s, vault)
+        add_debt_to_strategy(gov, s, vault, fish_amount // 4)
+    add_strategy_to_vault(gov, strategy, vault)
+    vault.update_max_debt_for_strategy(strategy.address, fish_amount // 4, sender=gov)
+
+    locked_strategy.setLockedFunds(fish_amount // 8, DAY, sender=gov)
+    lossy_strategy.setLoss(gov, fish_amount // 20, sender=gov)
+    vault.set_minimum_total_idle(fish_amount // 4, sender=gov)
+
+    targets = [
+        (locked_strategy.address, 0),
+        (lossy_strategy.address, 0),
+        (strategy.address, fish_amount),
+    ]
+    updates = vault_lens.preview_update_debts(vault.address, targets)
+
+    assert len(updates) == 3
+    assert updates[0].current_debt == fish_amount // 4
+    assert updates[0].new_debt == fish_amount // 8
+    assert updates[0].limits == DebtLimit.MAX_REDEEM
+
+    assert updates[1].current_debt == fish_amount // 4
+    assert updates[1].new_debt == fish_amount // 4
+    assert updates[1].limits & DebtLimit.UNREALISED_LOSSES
+
+    # Capped by the max debt, idle covers it even with the minimum.
+    assert updates[2].current_debt == 0
+    assert updates[2].new_debt == fish_amount // 4
+    assert updates[2].limits == DebtLimit.MAX_DEBT
+
+    # Each update that doesn't revert does what was previewed.
+    for target, update in zip(targets, updates):
+        if update.limits & DebtLimit.UNREALISED_LOSSES:
+            with ape.reverts("strategy has unrealised losses"):
+                vault.update_debt(target[0], target[1], sender=gov)
+        else:
+            tx = vault.update_debt(target[0], target[1], sender=gov)
+            assert tx.return_value == update.new_debt
+
+    assert vault.totalIdle() == fish_amount // 4 + fish_amount // 8
+
+    updates = vault_lens.preview_update_debts(
+        vault.address, [(strategy.address, fish_amount // 4)]
+    )
+    assert updates[0].limits == DebtLimit.EQUAL_DEBT
+
+    with ape.reverts("duplicate strategy"):
+        vault_lens.preview_update_debts(
+            vault.address, [(strategy.address, 0), (strategy.address, 0)]
+        )
+
+
+def test_unlock_schedule_at__matches_vault(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    airdrop_asset,
+    vault_lens,
+):
+    vault = create_vault(asset)
+    strategy = create_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    add_strategy_to_vault(gov, strategy, vault)
+    add_debt_to_strategy(gov, strategy, vault, fish_amount)
+
+    airdrop_asset(gov, asset, strategy, fish_amount // 10)
+    strategy.report(sender=gov)
+    vault.process_report(strategy.address, sender=gov)
+
+    full_profit_unlock_date = vault.fullProfitUnlockDate()
+    now = ape.chain.blocks.head.timestamp
+    assert full_profit_unlock_date > now
+
+    with ape.reverts("timestamp in the past"):
+        vault_lens.unlocked_shares_at(vault.address, now - 1)
+
+    # Project from part way through the schedule.
+    ape.chain.mine(timestamp=now + DAY)
+    now = ape.chain.blocks.head.timestamp
+    assert vault.unlockedShares() > 0
+
+    # Halfway through, at the unlock date and after it.
+    for timestamp in [
+        (now + full_profit_unlock_date) // 2,
+        full_profit_unlock_date,
+        full_profit_unlock_date + DAY,
+    ]:
+        unlocked_shares = vault_lens.unlocked_shares_at(vault.address, timestamp)
+        total_supply = vault_lens.total_supply_at(vault.address, timestamp)
+        price_per_share = vault_lens.price_per_share_at(vault.address, timestamp)
+
+        ape.chain.mine(timestamp=timestamp)
+
+        assert unlocked_shares == vault.unlockedShares()
+        assert total_supply == vault.totalSupply()
+        assert price_per_share == vault.pricePerShare()
+
+
+def test_preview_report__gain_with_fees__matches_process_report(
+    asset,
+    gov,
+    bunny,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    airdrop_asset,
+    deploy_accountant,
+    set_factory_fee_config,
+    vault_lens,
+):
+    vault = create_vault(asset)
+    strategy = create_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    add_strategy_to_vault(gov, strategy, vault)
+    add_debt_to_strategy(gov, strategy, vault, fish_amount)
+
+    # 10% performance fee with 10% of it to the protocol.
+    accountant = deploy_accountant(vault)
+    accountant.set_performance_fee(strategy.address, 1_000, sender=gov)
+    set_factory_fee_config(1_000, bunny)
+
+    gain = fish_amount // 10
+    airdrop_asset(gov, asset, strategy, gain)
+    strategy.report(sender=gov)
+
+    with ape.reverts("inactive strategy"):
+        vault_lens.preview_report(vault.address, bunny.address)
+
+    # The accountants fees are passed in.
+    total_fees = gain // 10
+    preview = vault_lens.preview_report(vault.address, strategy.address, total_fees, 0)
+    preview_timestamp = ape.chain.blocks.head.timestamp
+
+    tx = vault.process_report(strategy.address, sender=gov)
+    report_timestamp = ape.chain.blocks.head.timestamp
+
+    event = list(tx.decode_logs(vault.StrategyReported))[0]
+    assert preview.gain == event.gain == gain
+    assert preview.loss == event.loss == 0
+    assert preview.total_fees == event.total_fees == total_fees
+    assert preview.protocol_fees == event.protocol_fees == total_fees // 10
+    assert preview.total_refunds == event.total_refunds == 0
+
+    assert preview.shares_to_burn > 0
+    assert preview.shares_to_lock == vault.balanceOf(vault)
+    assert (
+        preview.full_profit_unlock_date - preview_timestamp
+        == vault.fullProfitUnlockDate() - report_timestamp
+    )
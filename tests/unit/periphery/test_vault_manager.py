@@ -0,0 +1,550 @@
+import ape
+from utils.constants import DAY, MAX_INT, ROLES
+
+
+def test_rebalance__no_debt_manager__reverts(asset, bunny, create_vault, vault_manager):
+    vault = create_vault(asset)
+
+    with ape.reverts("not allowed"):
+        vault_manager.rebalance(vault.address, [], sender=bunny)
+
+
+def test_rebalance__decreases_fund_increases(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_manager,
+):
+    vault = create_vault(asset)
+    strategies = [create_strategy(vault) for _ in range(3)]
+    user_deposit(fish, vault, asset, fish_amount)
+
+    for strategy in strategies:
+        add_strategy_to_vault(gov, strategy, vault)
+        vault.update_max_debt_for_strategy(strategy.address, fish_amount, sender=gov)
+    add_debt_to_strategy(gov, strategies[0], vault, fish_amount // 2)
+    add_debt_to_strategy(gov, strategies[1], vault, fish_amount // 2)
+    assert vault.totalIdle() == 0
+
+    vault.set_role(vault_manager.address, ROLES.DEBT_MANAGER, sender=gov)
+
+    # The increase comes first but is funded by the decrease.
+    targets = [
+        (strategies[2].address, fish_amount // 4, 0),
+        (strategies[0].address, fish_amount // 4, 0),
+        (strategies[1].address, fish_amount // 2, 0),
+    ]
+    tx = vault_manager.rebalance(vault.address, targets, sender=gov)
+
+    assert tx.return_value == [fish_amount // 4, fish_amount // 4, fish_amount // 2]
+
+    event = list(tx.decode_logs(vault.DebtUpdated))
+    assert len(event) == 2
+    assert event[0].strategy == strategies[0].address
+    assert event[0].new_debt == fish_amount // 4
+    assert event[1].strategy == strategies[2].address
+    assert event[1].new_debt == fish_amount // 4
+
+    assert vault.strategies(strategies[0]).current_debt == fish_amount // 4
+    assert vault.strategies(strategies[1]).current_debt == fish_amount // 2
+    assert vault.strategies(strategies[2]).current_debt == fish_amount // 4
+    assert vault.totalIdle() == 0
+    assert vault.totalDebt() == fish_amount
+
+
+def test_rebalance__locked_decrease__not_increased(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    create_locked_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_manager,
+):
+    vault = create_vault(asset)
+    locked_strategy = create_locked_strategy(vault)
+    strategy = create_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+
+    add_strategy_to_vault(gov, locked_strategy, vault)
+    add_debt_to_strategy(gov, locked_strategy, vault, fish_amount)
+    add_strategy_to_vault(gov, strategy, vault)
+    vault.update_max_debt_for_strategy(strategy.address, fish_amount, sender=gov)
+
+    # Only half can be pulled back.
+    locked_strategy.setLockedFunds(fish_amount // 2, DAY, sender=gov)
+
+    vault.set_role(vault_manager.address, ROLES.DEBT_MANAGER, sender=gov)
+
+    targets = [
+        (locked_strategy.address, 0, 0),
+        (strategy.address, fish_amount, 0),
+    ]
+    tx = vault_manager.rebalance(vault.address, targets, sender=gov)
+
+    assert tx.return_value == [fish_amount // 2, fish_amount // 2]
+    assert vault.strategies(locked_strategy).current_debt == fish_amount // 2
+    assert vault.strategies(strategy).current_debt == fish_amount // 2
+
+
+def test_set_target_weight__total_over_max_bps__reverts(
+    asset,
+    gov,
+    bunny,
+    create_vault,
+    create_strategy,
+    add_strategy_to_vault,
+    vault_manager,
+):
+    vault = create_vault(asset)
+    strategies = [create_strategy(vault) for _ in range(2)]
+    for strategy in strategies:
+        add_strategy_to_vault(gov, strategy, vault)
+
+    with ape.reverts("not allowed"):
+        vault_manager.set_target_weight(
+            vault.address, strategies[0].address, 5_000, sender=bunny
+        )
+
+    tx = vault_manager.set_target_weight(
+        vault.address, strategies[0].address, 6_000, sender=gov
+    )
+
+    event = list(tx.decode_logs(vault_manager.UpdateTargetWeight))
+    assert len(event) == 1
+    assert event[0].vault == vault.address
+    assert event[0].strategy == strategies[0].address
+    assert event[0].target_weight == 6_000
+
+    with ape.reverts("total weight too high"):
+        vault_manager.set_target_weight(
+            vault.address, strategies[1].address, 4_001, sender=gov
+        )
+
+    # Lowering an existing weight frees room for others.
+    vault_manager.set_target_weight(
+        vault.address, strategies[0].address, 5_000, sender=gov
+    )
+    vault_manager.set_target_weight(
+        vault.address, strategies[1].address, 5_000, sender=gov
+    )
+
+    assert vault_manager.target_weights(vault.address, strategies[0]) == 5_000
+    assert vault_manager.target_weights(vault.address, strategies[1]) == 5_000
+    assert vault_manager.total_weight(vault.address) == 10_000
+
+
+def test_set_target_weight__inactive_strategy__reverts_and_clears_after_revoke(
+    asset, gov, create_vault, create_strategy, add_strategy_to_vault, vault_manager
+):
+    vault = create_vault(asset)
+    strategy = create_strategy(vault)
+
+    with ape.reverts("inactive strategy"):
+        vault_manager.set_target_weight(
+            vault.address, strategy.address, 5_000, sender=gov
+        )
+
+    add_strategy_to_vault(gov, strategy, vault)
+    vault_manager.set_target_weight(vault.address, strategy.address, 5_000, sender=gov)
+    vault.revoke_strategy(strategy.address, sender=gov)
+
+    # The weight outlives the strategy until it is cleared.
+    assert vault_manager.total_weight(vault.address) == 5_000
+
+    with ape.reverts("inactive strategy"):
+        vault_manager.set_target_weight(
+            vault.address, strategy.address, 1_000, sender=gov
+        )
+
+    vault_manager.set_target_weight(vault.address, strategy.address, 0, sender=gov)
+
+    assert vault_manager.target_weights(vault.address, strategy) == 0
+    assert vault_manager.total_weight(vault.address) == 0
+
+
+def test_allocate__fills_largest_deficit_first(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    bunny,
+    create_vault,
+    create_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    vault_manager,
+):
+    vault = create_vault(asset)
+    strategies = [create_strategy(vault) for _ in range(3)]
+    user_deposit(fish, vault, asset, fish_amount)
+
+    for strategy, weight in zip(strategies, [1_000, 6_000, 3_000]):
+        add_strategy_to_vault(gov, strategy, vault)
+        vault.update_max_debt_for_strategy(strategy.address, MAX_INT, sender=gov)
+        vault_manager.set_target_weight(
+            vault.address, strategy.address, weight, sender=gov
+        )
+
+    vault.set_role(vault_manager.address, ROLES.DEBT_MANAGER, sender=gov)
+
+    with ape.reverts("not allowed"):
+        vault_manager.allocate(vault.address, sender=bunny)
+
+    # Only enough idle for the largest deficit and part of the next.
+    vault.set_minimum_total_idle(fish_amount // 5, sender=gov)
+
+    tx = vault_manager.allocate(vault.address, sender=gov)
+
+    assert tx.return_value == fish_amount - fish_amount // 5
+
+    event = list(tx.decode_logs(vault.DebtUpdated))
+    assert len(event) == 2
+    assert event[0].strategy == strategies[1].address
+    assert event[0].new_debt == fish_amount * 6 // 10
+    assert event[1].strategy == strategies[2].address
+    assert event[1].new_debt == fish_amount * 2 // 10
+
+    assert vault.strategies(strategies[0]).current_debt == 0
+    assert vault.totalIdle() == fish_amount // 5
+
+    # Nothing left above the minimum.
+    tx = vault_manager.allocate(vault.address, sender=gov)
+    assert tx.return_value == 0
+
+
+def test_deploy_idle__spreads_by_headroom(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    bunny,
+    create_vault,
+    create_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    vault_manager,
+):
+    vault = create_vault(asset)
+    strategies = [create_strategy(vault) for _ in range(3)]
+    user_deposit(fish, vault, asset, fish_amount)
+
+    # The last strategy can't take anything.
+    for strategy, max_debt in zip(strategies, [2, 6, 0]):
+        add_strategy_to_vault(gov, strategy, vault)
+        vault.update_max_debt_for_strategy(
+            strategy.address, fish_amount * max_debt // 10, sender=gov
+        )
+
+    vault.set_role(vault_manager.address, ROLES.DEBT_MANAGER, sender=gov)
+
+    with ape.reverts("not allowed"):
+        vault_manager.deploy_idle(vault.address, sender=bunny)
+
+    # Less idle than the strategies can take in total.
+    vault.set_minimum_total_idle(fish_amount * 6 // 10, sender=gov)
+
+    tx = vault_manager.deploy_idle(vault.address, sender=gov)
+
+    assert tx.return_value == fish_amount * 4 // 10
+    assert len(list(tx.decode_logs(vault.DebtUpdated))) == 2
+    assert vault.strategies(strategies[0]).current_debt == fish_amount // 10
+    assert vault.strategies(strategies[1]).current_debt == fish_amount * 3 // 10
+    assert vault.strategies(strategies[2]).current_debt == 0
+    assert vault.totalIdle() == fish_amount * 6 // 10
+
+    # More idle than they can take fills them completely.
+    vault.set_minimum_total_idle(0, sender=gov)
+
+    tx = vault_manager.deploy_idle(vault.address, sender=gov)
+
+    assert tx.return_value == fish_amount * 4 // 10
+    assert vault.strategies(strategies[0]).current_debt == fish_amount * 2 // 10
+    assert vault.strategies(strategies[1]).current_debt == fish_amount * 6 // 10
+    assert vault.totalIdle() == fish_amount * 2 // 10
+
+    # Nothing else to deploy.
+    tx = vault_manager.deploy_idle(vault.address, sender=gov)
+    assert tx.return_value == 0
+
+
+def test_configure__max_debts_and_queue(
+    asset, gov, bunny, create_vault, create_strategy, vault_manager
+):
+    vault = create_vault(asset)
+    strategies = [create_strategy(vault) for _ in range(3)]
+    for strategy in strategies:
+        vault.add_strategy(strategy.address, sender=gov)
+
+    max_debts = [(s.address, (i + 1) * 10**18) for i, s in enumerate(strategies)]
+    new_queue = [s.address for s in strategies[::-1]]
+
+    with ape.reverts("not allowed"):
+        vault_manager.configure(vault.address, max_debts, sender=bunny)
+
+    vault.set_role(
+        vault_manager.address,
+        ROLES.MAX_DEBT_MANAGER | ROLES.QUEUE_MANAGER,
+        sender=gov,
+    )
+
+    # Only holding one of the roles is not enough for both changes.
+    vault.set_role(bunny.address, ROLES.MAX_DEBT_MANAGER, sender=gov)
+    with ape.reverts("not allowed"):
+        vault_manager.configure(vault.address, max_debts, new_queue, sender=bunny)
+
+    tx = vault_manager.configure(vault.address, max_debts, new_queue, sender=gov)
+
+    event = list(tx.decode_logs(vault.UpdatedMaxDebtForStrategy))
+    assert len(event) == 3
+    for i, strategy in enumerate(strategies):
+        assert event[i].strategy == strategy.address
+        assert vault.strategies(strategy).max_debt == (i + 1) * 10**18
+
+    event = list(tx.decode_logs(vault.UpdateDefaultQueue))
+    assert len(event) == 1
+    assert vault.get_default_queue() == new_queue
+
+    # An empty queue keeps the current one.
+    vault_manager.configure(vault.address, max_debts[:1], sender=bunny)
+    assert vault.get_default_queue() == new_queue
+
+
+def test_report_and_reduce__lossy_strategy(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    bunny,
+    create_vault,
+    create_lossy_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_manager,
+):
+    vault = create_vault(asset)
+    lossy_strategy = create_lossy_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    add_strategy_to_vault(gov, lossy_strategy, vault)
+    add_debt_to_strategy(gov, lossy_strategy, vault, fish_amount)
+
+    loss = fish_amount // 10
+    lossy_strategy.setLoss(gov.address, loss, sender=gov)
+
+    # Can't reduce debt with unrealised losses.
+    with ape.reverts("strategy has unrealised losses"):
+        vault.update_debt(lossy_strategy.address, 0, sender=gov)
+
+    vault.set_role(
+        vault_manager.address,
+        ROLES.REPORTING_MANAGER | ROLES.DEBT_MANAGER,
+        sender=gov,
+    )
+
+    # Both roles are needed.
+    vault.set_role(bunny.address, ROLES.DEBT_MANAGER, sender=gov)
+    with ape.reverts("not allowed"):
+        vault_manager.report_and_reduce(
+            vault.address, lossy_strategy.address, 0, 0, sender=bunny
+        )
+
+    tx = vault_manager.report_and_reduce(
+        vault.address, lossy_strategy.address, 0, 0, sender=gov
+    )
+
+    assert tx.return_value == 0
+
+    event = list(tx.decode_logs(vault.StrategyReported))
+    assert len(event) == 1
+    assert event[0].loss == loss
+
+    event = list(tx.decode_logs(vault.DebtUpdated))
+    assert len(event) == 1
+    assert event[0].current_debt == fish_amount - loss
+    assert event[0].new_debt == 0
+
+    assert vault.totalDebt() == 0
+    assert vault.totalIdle() == fish_amount - loss
+
+
+def test_debt_seconds__accrues_between_checkpoints(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    vault_manager,
+):
+    vault = create_vault(asset)
+    strategy = create_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+    add_strategy_to_vault(gov, strategy, vault)
+    vault.update_max_debt_for_strategy(strategy.address, fish_amount, sender=gov)
+    vault.set_role(vault_manager.address, ROLES.DEBT_MANAGER, sender=gov)
+
+    assert vault_manager.debt_seconds(vault.address, strategy.address) == 0
+
+    first_debt = fish_amount // 2
+    vault_manager.rebalance(
+        vault.address, [(strategy.address, first_debt, 0)], sender=gov
+    )
+    start = ape.chain.blocks.head.timestamp
+
+    checkpoint = vault_manager.debt_checkpoints(vault.address, strategy.address)
+    assert checkpoint.debt_seconds == 0
+    assert checkpoint.current_debt == first_debt
+    assert checkpoint.last_update == start
+
+    # Debt changes through the manager are counted from when they happen.
+    ape.chain.mine(timestamp=ape.chain.pending_timestamp + DAY)
+    vault_manager.rebalance(
+        vault.address, [(strategy.address, fish_amount, 0)], sender=gov
+    )
+    change = ape.chain.blocks.head.timestamp
+    ape.chain.mine(timestamp=ape.chain.pending_timestamp + DAY)
+
+    assert vault_manager.debt_seconds(vault.address, strategy.address) == first_debt * (
+        change - start
+    ) + fish_amount * (ape.chain.blocks.head.timestamp - change)
+
+    # Changes made straight on the vault only count from the next checkpoint.
+    vault.update_debt(strategy.address, first_debt, sender=gov)
+    ape.chain.mine(timestamp=ape.chain.pending_timestamp + DAY)
+
+    # Anyone can checkpoint.
+    vault_manager.checkpoint(vault.address, [strategy.address], sender=fish)
+    now = ape.chain.blocks.head.timestamp
+
+    checkpoint = vault_manager.debt_checkpoints(vault.address, strategy.address)
+    assert checkpoint.debt_seconds == first_debt * (change - start) + fish_amount * (
+        now - change
+    )
+    assert checkpoint.current_debt == first_debt
+    assert checkpoint.last_update == now
+
+    ape.chain.mine(timestamp=ape.chain.pending_timestamp + DAY)
+    assert vault_manager.debt_seconds(
+        vault.address, strategy.address
+    ) == checkpoint.debt_seconds + first_debt * (
+        ape.chain.blocks.head.timestamp - checkpoint.last_update
+    )
+
+
+def test_drain_all__skips_failing_strategy(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    create_lossy_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    vault_manager,
+):
+    vault = create_vault(asset)
+    strategy = create_strategy(vault)
+    lossy_strategy = create_lossy_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+
+    debt = fish_amount // 2
+    for s in [strategy, lossy_strategy]:
+        add_strategy_to_vault(gov, s, vault)
+        add_debt_to_strategy(gov, s, vault, debt)
+
+    vault.set_role(vault_manager.address, ROLES.DEBT_MANAGER, sender=gov)
+
+    with ape.reverts("not shutdown"):
+        vault_manager.drain_all(vault.address, 0, sender=gov)
+
+    # The vault will not reduce debt with unrealised losses.
+    lossy_strategy.setLoss(gov, debt // 10, sender=gov)
+    vault.shutdown_vault(sender=gov)
+
+    with ape.reverts("not allowed"):
+        vault_manager.drain_all(vault.address, 0, sender=fish)
+
+    tx = vault_manager.drain_all(vault.address, 0, sender=gov)
+
+    assert tx.return_value == debt
+
+    event = list(tx.decode_logs(vault_manager.DrainFailed))
+    assert len(event) == 1
+    assert event[0].vault == vault.address
+    assert event[0].strategy == lossy_strategy.address
+
+    assert vault.strategies(strategy).current_debt == 0
+    assert vault.strategies(lossy_strategy).current_debt == debt
+    assert vault.totalIdle() == debt
+
+    # Once the loss is reported the rest can be drained.
+    vault.process_report(lossy_strategy.address, sender=gov)
+    tx = vault_manager.drain_all(vault.address, 0, sender=gov)
+
+    assert tx.return_value == debt - debt // 10
+    assert vault.strategies(lossy_strategy).current_debt == 0
+    assert vault.totalDebt() == 0
+
+
+def test_process_reports__many_strategies(
+    asset,
+    gov,
+    fish,
+    fish_amount,
+    create_vault,
+    create_strategy,
+    create_lossy_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    airdrop_asset,
+    vault_manager,
+):
+    vault = create_vault(asset)
+    strategy = create_strategy(vault)
+    lossy_strategy = create_lossy_strategy(vault)
+    user_deposit(fish, vault, asset, fish_amount)
+
+    debt = fish_amount // 2
+    for s in [strategy, lossy_strategy]:
+        add_strategy_to_vault(gov, s, vault)
+        add_debt_to_strategy(gov, s, vault, debt)
+
+    gain = debt // 5
+    loss = debt // 10
+    airdrop_asset(gov, asset, strategy, gain)
+    strategy.report(sender=gov)
+    lossy_strategy.setLoss(gov, loss, sender=gov)
+
+    vault.set_role(vault_manager.address, ROLES.REPORTING_MANAGER, sender=gov)
+
+    with ape.reverts("not allowed"):
+        vault_manager.process_reports(vault.address, [strategy.address], sender=fish)
+
+    tx = vault_manager.process_reports(
+        vault.address, [strategy.address, lossy_strategy.address], sender=gov
+    )
+
+    assert list(tx.return_value) == [gain, loss]
+    assert len(list(tx.decode_logs(vault.StrategyReported))) == 2
+    assert vault.strategies(strategy).current_debt == debt + gain
+    assert vault.strategies(lossy_strategy).current_debt == debt - loss
+    assert (
+        vault_manager.debt_checkpoints(vault.address, strategy.address).current_debt
+        == debt + gain
+    )
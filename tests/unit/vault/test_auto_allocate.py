@@ -435,3 +435,80 @@ def test_deposit__auto_update_debt__current_debt_more_than_max_debt(
     assert strategy.balanceOf(vault) == max_debt
     assert vault.strategies(strategy)["current_debt"] == max_debt + profit
     assert vault.balanceOf(fish) > assets
+
+
+def test_deposit__below_auto_allocate_threshold__stays_idle(
+    asset, fish, fish_amount, gov, vault, strategy, user_deposit
+):
+    assets = fish_amount // 2
+
+    vault.set_auto_allocate(True, sender=gov)
+    tx = vault.set_auto_allocate_threshold(fish_amount, sender=gov)
+
+    event = list(tx.decode_logs(vault.UpdateAutoAllocateThreshold))
+    assert len(event) == 1
+    assert event[0].auto_allocate_threshold == fish_amount
+    assert vault.auto_allocate_threshold() == fish_amount
+
+    vault.update_max_debt_for_strategy(strategy, fish_amount * 2, sender=gov)
+
+    asset.approve(vault, fish_amount, sender=fish)
+
+    # Below the threshold the deposit stays idle.
+    tx = vault.deposit(assets, fish, sender=fish)
+
+    assert len(list(tx.decode_logs(vault.DebtUpdated))) == 0
+    assert vault.totalIdle() == assets
+    assert vault.totalDebt() == 0
+    assert vault.strategies(strategy)["current_debt"] == 0
+
+    # The deposit that reaches the threshold allocates everything.
+    tx = vault.deposit(fish_amount - assets, fish, sender=fish)
+
+    event = list(tx.decode_logs(vault.DebtUpdated))
+    assert len(event) == 1
+    assert event[0].strategy == strategy
+    assert event[0].current_debt == 0
+    assert event[0].new_debt == fish_amount
+
+    assert vault.totalIdle() == 0
+    assert vault.totalDebt() == fish_amount
+    assert vault.strategies(strategy)["current_debt"] == fish_amount
+    assert vault.balanceOf(fish) == fish_amount
+
+
+def test_deposit__auto_allocate_threshold__ignores_min_idle(
+    asset, fish, fish_amount, gov, vault, strategy
+):
+    min_idle = fish_amount // 2
+    threshold = fish_amount // 4
+
+    vault.set_auto_allocate(True, sender=gov)
+    vault.set_auto_allocate_threshold(threshold, sender=gov)
+    vault.set_minimum_total_idle(min_idle, sender=gov)
+    vault.update_max_debt_for_strategy(strategy, 2**256 - 1, sender=gov)
+
+    asset.approve(vault, fish_amount, sender=fish)
+
+    # Total idle is over the threshold but what can be allocated is not.
+    tx = vault.deposit(min_idle + threshold // 2, fish, sender=fish)
+
+    assert len(list(tx.decode_logs(vault.DebtUpdated))) == 0
+    assert vault.totalIdle() == min_idle + threshold // 2
+    assert vault.totalDebt() == 0
+
+    tx = vault.deposit(threshold // 2, fish, sender=fish)
+
+    event = list(tx.decode_logs(vault.DebtUpdated))
+    assert len(event) == 1
+    assert event[0].strategy == strategy
+    assert event[0].new_debt == threshold
+
+    assert vault.totalIdle() == min_idle
+    assert vault.totalDebt() == threshold
+    assert vault.strategies(strategy)["current_debt"] == threshold
+
+
+def test_set_auto_allocate_threshold__no_debt_manager__reverts(vault, bunny):
+    with ape.reverts("not allowed"):
+        vault.set_auto_allocate_threshold(1, sender=bunny)
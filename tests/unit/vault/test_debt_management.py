@@ -1,6 +1,6 @@
 import ape
 import pytest
-from utils.constants import DAY
+from utils.constants import DAY, MAX_INT
 
 
 @pytest.fixture(autouse=True)
@@ -732,3 +732,98 @@ def test_update_debt__with_lossy_strategy_that_withdraws_less_than_requested_wit
     assert asset.balanceOf(vault) == (vault_balance - loss + fish_amount)
     assert vault.totalIdle() == initial_idle + difference
     assert vault.totalDebt() == new_debt
+
+
+def test_update_debt__untrusted_strategy__resets_allowance(gov, asset, vault, strategy):
+    new_debt = asset.balanceOf(vault) // 2
+
+    vault.update_max_debt_for_strategy(strategy.address, new_debt, sender=gov)
+    vault.update_debt(strategy.address, new_debt, sender=gov)
+
+    assert vault.strategies(strategy.address).current_debt == new_debt
+    assert asset.allowance(vault, strategy) == 0
+
+
+def test_update_debt__trusted_strategies__keeps_standing_allowance(
+    gov, asset, vault, strategy
+):
+    vault_balance = asset.balanceOf(vault)
+    new_debt = vault_balance // 2
+
+    vault.set_trust_strategies(True, sender=gov)
+    vault.update_max_debt_for_strategy(strategy.address, vault_balance, sender=gov)
+
+    tx = vault.update_debt(strategy.address, new_debt, sender=gov)
+
+    # Nothing to reset without a leftover allowance.
+    event = list(tx.decode_logs(asset.Approval))
+    assert len(event) == 1
+    assert event[0].value == MAX_INT
+    assert vault.strategies(strategy.address).current_debt == new_debt
+    assert asset.allowance(vault, strategy) == MAX_INT
+
+    # No approvals needed while the allowance covers the deposit.
+    tx = vault.update_debt(strategy.address, vault_balance, sender=gov)
+
+    assert len(list(tx.decode_logs(asset.Approval))) == 0
+    assert vault.strategies(strategy.address).current_debt == vault_balance
+    assert asset.balanceOf(strategy) == vault_balance
+    assert vault.totalIdle() == 0
+    assert vault.totalDebt() == vault_balance
+
+    # Revoking the strategy removes the allowance.
+    vault.update_debt(strategy.address, 0, sender=gov)
+    vault.revoke_strategy(strategy.address, sender=gov)
+
+    assert asset.allowance(vault, strategy) == 0
+
+
+def test_set_trust_strategies__off__resets_standing_allowance(
+    gov, asset, vault, strategy
+):
+    vault_balance = asset.balanceOf(vault)
+    new_debt = vault_balance // 2
+
+    vault.set_trust_strategies(True, sender=gov)
+    vault.update_max_debt_for_strategy(strategy.address, vault_balance, sender=gov)
+    vault.update_debt(strategy.address, new_debt, sender=gov)
+
+    assert asset.allowance(vault, strategy) == MAX_INT
+
+    vault.set_trust_strategies(False, sender=gov)
+
+    assert asset.allowance(vault, strategy) == 0
+
+    vault.update_debt(strategy.address, vault_balance, sender=gov)
+
+    assert vault.strategies(strategy.address).current_debt == vault_balance
+    assert asset.allowance(vault, strategy) == 0
+
+
+def test_update_debt__untrusted_with_leftover_allowance__resets_before_approving(
+    gov, asset, vault, create_strategy
+):
+    vault_balance = asset.balanceOf(vault)
+    new_debt = vault_balance // 2
+    # Outside the default queue so changing trust won't reset its allowance.
+    strategy = create_strategy(vault)
+    vault.add_strategy(strategy.address, False, sender=gov)
+    strategy.setMaxDebt(MAX_INT, sender=gov)
+    vault.update_max_debt_for_strategy(strategy.address, vault_balance, sender=gov)
+
+    vault.set_trust_strategies(True, sender=gov)
+    vault.update_debt(strategy.address, new_debt, sender=gov)
+    vault.set_trust_strategies(False, sender=gov)
+
+    assert asset.allowance(vault, strategy) == MAX_INT
+
+    tx = vault.update_debt(strategy.address, vault_balance, sender=gov)
+
+    # Reset first for tokens that can't change a non zero allowance.
+    event = list(tx.decode_logs(asset.Approval))
+    assert len(event) == 3
+    assert event[0].value == 0
+    assert event[1].value == vault_balance - new_debt
+    assert event[2].value == 0
+    assert vault.strategies(strategy.address).current_debt == vault_balance
+    assert asset.allowance(vault, strategy) == 0
@@ -77,6 +77,24 @@ def test_force_revoke_strategy__revoke_strategy_manager(
     assert event[0].change_type == StrategyChangeType.REVOKED
 
 
+def test_set_trust_strategies__no_add_strategy_manager__reverts(vault, bunny):
+    with ape.reverts("not allowed"):
+        vault.set_trust_strategies(True, sender=bunny)
+
+
+def test_set_trust_strategies__add_strategy_manager(gov, vault, bunny):
+    # We temporarily give bunny the role
+    vault.set_role(bunny.address, ROLES.ADD_STRATEGY_MANAGER, sender=gov)
+
+    assert vault.trust_strategies() == False
+    tx = vault.set_trust_strategies(True, sender=bunny)
+
+    event = list(tx.decode_logs(vault.UpdateTrustStrategies))
+    assert len(event) == 1
+    assert event[0].trust_strategies == True
+    assert vault.trust_strategies() == True
+
+
 # ACCOUNTING MANAGEMENT
 
 
@@ -169,6 +169,134 @@ def test_withdraw__with_multiple_liquid_strategies__withdraws(
     assert asset.balanceOf(fish) == amount
 
 
+def test_withdraw__with_zero_debt_strategy_in_queue__skips_strategy(
+    gov,
+    fish,
+    fish_amount,
+    asset,
+    create_vault,
+    create_strategy,
+    create_reverting_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+):
+    vault = create_vault(asset)
+    amount = fish_amount
+    shares = amount
+    # Any call to the parked strategy would revert the withdraw.
+    empty_strategy = create_reverting_strategy(vault)
+    funded_strategy = create_strategy(vault)
+    strategies = [empty_strategy, funded_strategy]
+    max_loss = 0
+
+    # deposit assets to vault
+    user_deposit(fish, vault, asset, amount)
+
+    # set up strategies, only the second one gets debt
+    vault.set_role(
+        gov.address,
+        ROLES.ADD_STRATEGY_MANAGER | ROLES.DEBT_MANAGER | ROLES.MAX_DEBT_MANAGER,
+        sender=gov,
+    )
+    for strategy in strategies:
+        add_strategy_to_vault(gov, strategy, vault)
+    add_debt_to_strategy(gov, funded_strategy, vault, amount)
+
+    assert vault.strategies(empty_strategy).current_debt == 0
+    assert vault.get_default_queue() == [s.address for s in strategies]
+    assert vault.maxWithdraw(fish.address) == amount
+
+    tx = vault.withdraw(
+        shares,
+        fish.address,
+        fish.address,
+        max_loss,
+        sender=fish,
+    )
+    event = list(tx.decode_logs(vault.Withdraw))
+
+    assert len(event) == 1
+    assert event[0].shares == shares
+    assert event[0].assets == amount
+
+    event = list(tx.decode_logs(vault.DebtUpdated))
+
+    assert len(event) == 1
+    assert event[0].strategy == funded_strategy.address
+    assert event[0].current_debt == amount
+    assert event[0].new_debt == 0
+
+    checks.check_vault_empty(vault)
+    assert asset.balanceOf(vault) == 0
+    assert asset.balanceOf(funded_strategy) == 0
+    assert asset.balanceOf(fish) == amount
+
+
+@pytest.mark.parametrize("trust_strategies", [True, False])
+def test_withdraw__with_trusted_strategies__uses_redeem_return(
+    gov,
+    fish,
+    fish_amount,
+    asset,
+    create_vault,
+    create_misreporting_strategy,
+    user_deposit,
+    add_strategy_to_vault,
+    add_debt_to_strategy,
+    trust_strategies,
+):
+    vault = create_vault(asset)
+    amount = fish_amount
+    shares = amount
+    strategy = create_misreporting_strategy(vault)
+    shortfall = amount // 10
+    max_loss = 10_000
+
+    user_deposit(fish, vault, asset, amount)
+
+    vault.set_role(
+        gov.address,
+        ROLES.ADD_STRATEGY_MANAGER | ROLES.DEBT_MANAGER | ROLES.MAX_DEBT_MANAGER,
+        sender=gov,
+    )
+    add_strategy_to_vault(gov, strategy, vault)
+    add_debt_to_strategy(gov, strategy, vault, amount)
+
+    # The strategy transfers everything but reports less.
+    strategy.setRedeemShortfall(shortfall, sender=gov)
+    vault.set_trust_strategies(trust_strategies, sender=gov)
+
+    tx = vault.redeem(
+        shares,
+        fish.address,
+        fish.address,
+        max_loss,
+        sender=fish,
+    )
+
+    # Trusted mode books what redeem returned, otherwise what was received.
+    withdrawn = amount - shortfall if trust_strategies else amount
+
+    event = list(tx.decode_logs(vault.Withdraw))
+
+    assert len(event) == 1
+    assert event[0].shares == shares
+    assert event[0].assets == withdrawn
+
+    event = list(tx.decode_logs(vault.DebtUpdated))
+
+    assert len(event) == 1
+    assert event[0].strategy == strategy.address
+    assert event[0].current_debt == amount
+    assert event[0].new_debt == 0
+
+    checks.check_vault_empty(vault)
+    assert asset.balanceOf(fish) == withdrawn
+    # Anything not booked is left in the vault unaccounted for.
+    assert asset.balanceOf(vault) == amount - withdrawn
+
+
 def test_withdraw__locked_funds_with_locked_and_liquid_strategy__reverts(
     gov,
     fish,
@@ -35,3 +35,13 @@ class StrategyChangeType(IntFlag):
 class RoleStatusChange(IntFlag):
     OPENED = 1
     CLOSED = 2
+
+
+class DebtLimit(IntFlag):
+    EQUAL_DEBT = 1
+    SHUTDOWN = 2
+    MAX_DEBT = 4
+    MAX_DEPOSIT = 8
+    MINIMUM_IDLE = 16
+    MAX_REDEEM = 32
+    UNREALISED_LOSSES = 64
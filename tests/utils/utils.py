@@ -35,3 +35,52 @@ def sleep(seconds: int = 6 * 60 * 60):
 
 def days_to_secs(days: int) -> int:
     return 60 * 60 * 24 * days
+
+
+def get_withdraw_queue(vault, assets, strategies):
+    """
+    Off-chain version of `VaultLens.get_withdraw_queue` taking the
+    strategy contracts to choose from and returning their addresses.
+    """
+    assets_needed = assets - vault.totalIdle()
+    if assets_needed <= 0:
+        return []
+
+    candidates = []
+    for strategy in strategies:
+        current_debt = vault.strategies(strategy.address).current_debt
+        if current_debt == 0:
+            continue
+
+        current_assets = strategy.convertToAssets(strategy.balanceOf(vault.address))
+        max_withdraw = strategy.convertToAssets(strategy.maxRedeem(vault.address))
+        if current_assets >= current_debt:
+            coverage = min(current_debt, max_withdraw)
+            lossy = False
+        elif current_assets == 0:
+            coverage = current_debt
+            lossy = True
+        else:
+            coverage = min(current_debt, max_withdraw * current_debt // current_assets)
+            lossy = True
+
+        if coverage > 0:
+            candidates.append([strategy.address, coverage, lossy])
+
+    queue = []
+    # Strategies without unrealised losses first.
+    for with_losses in [False, True]:
+        group = [c for c in candidates if c[2] == with_losses]
+        while assets_needed > 0 and group:
+            covering = [c for c in group if c[1] >= assets_needed]
+            if covering:
+                # Smallest that covers everything still needed.
+                best = min(covering, key=lambda c: c[1])
+            else:
+                best = max(group, key=lambda c: c[1])
+
+            queue.append(best[0])
+            assets_needed -= min(assets_needed, best[1])
+            group.remove(best)
+
+    return queue